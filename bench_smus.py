@@ -0,0 +1,588 @@
+"""
+SMUS MCP 서버 벤치마크 / 부하 테스트
+
+로컬 MySQL(도커 컨테이너)에 smu_meals / smu_notices / smu_exam / smu_schedule 합성 데이터를
+원하는 규모로 채운 뒤, lastdance1008.py의 모든 툴을
+  - direct: 프로세스 안에서 툴 함수를 직접 호출
+  - http:   `python lastdance1008.py`로 서버를 띄우고 streamable-HTTP MCP 엔드포인트로 호출
+두 가지 방식, 여러 동시성 수준에서 실행하고 툴별
+  p50/p95/p99 지연, 처리량, DB 시간 vs 직렬화 시간(direct), 응답 크기, 최대 RSS
+를 JSON으로 기록한다. 두 실행 결과는 --compare로 비교할 수 있다.
+
+툴/모드마다 별도 프로세스(또는 서버 프로세스)를 띄우므로 최대 RSS는 툴 단위 값이다.
+
+예시:
+  # MySQL 컨테이너 기동 + 1만 행 시드 + direct/http 모두 측정
+  python bench_smus.py --start-mysql --scale 10000 --concurrency 1,16,64 --out bench.json
+
+  # 이전 결과와 비교
+  python bench_smus.py --no-seed --out bench_new.json --compare bench.json
+"""
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import pymysql
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_SCRIPT = os.path.join(HERE, "lastdance1008.py")
+
+MYSQL_CONTAINER = "smus-bench-mysql"
+MYSQL_IMAGE = "mysql:8.0"
+
+# ---- 합성 데이터 ----
+MEAL_WORDS = ["쌀밥", "잡곡밥", "김치찌개", "된장국", "미역국", "제육볶음", "돈까스", "닭갈비", "비빔밥",
+              "떡볶이", "김치", "깍두기", "샐러드", "우동", "짜장면", "카레라이스", "불고기", "계란말이"]
+NOTICE_WORDS = ["학사", "장학금", "수강신청", "등록금", "졸업", "공지", "안내", "모집", "행사", "취업",
+                "특강", "도서관", "기숙사", "중간고사", "기말고사", "휴강", "변경", "신청", "결과", "발표"]
+SUBJECTS = ["자료구조", "알고리즘", "운영체제", "데이터베이스", "컴퓨터네트워크", "인공지능", "선형대수",
+            "미적분학", "일반물리", "경영학원론", "회계원리", "마케팅", "심리학개론", "영어회화", "글쓰기"]
+PROFESSORS = ["김", "이", "박", "최", "정", "강", "조", "윤", "장", "임"]
+SCHEDULE_WORDS = ["개강", "종강", "중간고사", "기말고사", "수강신청", "축제", "휴일", "보강", "과제 마감",
+                  "팀 회의", "스터디", "면담", "동아리", "발표 준비", "시험 공부"]
+CATEGORIES = ["breakfast", "lunch", "dinner"]
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS smu_meals (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        `date` DATE NOT NULL,
+        category VARCHAR(16) NOT NULL,
+        meal TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS smu_notices (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        url VARCHAR(255),
+        content TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS smu_exam (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        subject_name VARCHAR(100),
+        professor VARCHAR(50),
+        exam_date DATETIME,
+        location VARCHAR(100),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS smu_schedule (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        start_date DATETIME NOT NULL,
+        end_date DATETIME NOT NULL,
+        content VARCHAR(255) NOT NULL,
+        type VARCHAR(16) NOT NULL,
+        user_id VARCHAR(32),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET=utf8mb4
+    """,
+]
+
+
+def _db_conf(args) -> dict:
+    return {"host": args.db_host, "port": args.db_port, "user": args.db_user,
+            "password": args.db_password, "database": args.db_name}
+
+
+def _connect(args, database: bool = True):
+    conf = _db_conf(args)
+    if not database:
+        conf.pop("database")
+    return pymysql.connect(charset="utf8mb4", autocommit=True, **conf)
+
+
+def start_mysql(args) -> None:
+    """도커로 로컬 MySQL 기동 후 접속 가능할 때까지 대기"""
+    subprocess.run(["docker", "rm", "-f", MYSQL_CONTAINER], capture_output=True)
+    subprocess.run(
+        ["docker", "run", "-d", "--rm", "--name", MYSQL_CONTAINER,
+         "-e", f"MYSQL_ROOT_PASSWORD={args.db_password}", "-e", f"MYSQL_DATABASE={args.db_name}",
+         "-p", f"{args.db_port}:3306", MYSQL_IMAGE],
+        check=True,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            _connect(args).close()
+            return
+        except pymysql.MySQLError:
+            time.sleep(2)
+    raise RuntimeError("MySQL container did not become ready in 120s")
+
+
+def _scale_counts(scale: int) -> dict:
+    # 실제 비율에 가깝게: 공지 > 일정 > 식단 > 시험
+    return {
+        "smu_notices": scale,
+        "smu_schedule": max(100, scale // 2),
+        "smu_meals": max(21, scale // 4),
+        "smu_exam": max(50, scale // 10),
+    }
+
+
+def seed(args) -> dict:
+    rnd = random.Random(args.seed)
+    counts = _scale_counts(args.scale)
+    conn = _connect(args, database=False)
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.db_name}` DEFAULT CHARSET utf8mb4")
+    conn.close()
+
+    conn = _connect(args)
+    today = date.today()
+    with conn.cursor() as cur:
+        for table in ("smu_meals", "smu_notices", "smu_exam", "smu_schedule"):
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+        for ddl in SCHEMA:
+            cur.execute(ddl)
+
+        def insert(sql, rows):
+            # 1M 행 규모에서도 메모리에 다 올리지 않도록 1000행씩 끊어서 적재
+            rows = iter(rows)
+            while chunk := list(itertools.islice(rows, 1000)):
+                cur.executemany(sql, chunk)
+
+        n_days = max(1, counts["smu_meals"] // 3)
+        start = today - timedelta(days=n_days // 2)
+        insert(
+            "INSERT INTO smu_meals (`date`, category, meal) VALUES (%s, %s, %s)",
+            (((start + timedelta(days=i // 3)).isoformat(), CATEGORIES[i % 3],
+              ", ".join(rnd.sample(MEAL_WORDS, 5))) for i in range(counts["smu_meals"])),
+        )
+        insert(
+            "INSERT INTO smu_notices (title, url, content, created_at) VALUES (%s, %s, %s, %s)",
+            ((" ".join(rnd.sample(NOTICE_WORDS, 4)) + f" {i}",
+              f"https://www.smu.ac.kr/notice/{i}",
+              " ".join(rnd.choices(NOTICE_WORDS, k=60)),
+              datetime.now() - timedelta(minutes=counts["smu_notices"] - i))
+             for i in range(counts["smu_notices"])),
+        )
+        insert(
+            "INSERT INTO smu_exam (subject_name, professor, exam_date, location) VALUES (%s, %s, %s, %s)",
+            ((rnd.choice(SUBJECTS) + (f" {rnd.randint(1, 3)}" if rnd.random() < 0.5 else ""),
+              rnd.choice(PROFESSORS) + "교수",
+              datetime.combine(today + timedelta(days=rnd.randint(-60, 60)), datetime.min.time()),
+              f"{rnd.choice('ABCDEFG')}{rnd.randint(100, 599)}")
+             for _ in range(counts["smu_exam"])),
+        )
+        def schedules():
+            for i in range(counts["smu_schedule"]):
+                s = datetime.combine(today + timedelta(days=rnd.randint(-180, 180)), datetime.min.time())
+                s += timedelta(hours=rnd.randint(8, 20))
+                e = s + timedelta(days=rnd.choice([0, 0, 0, 1, 3, 7]), hours=rnd.randint(0, 3))
+                personal = rnd.random() < 0.7
+                yield (s, e, rnd.choice(SCHEDULE_WORDS) + f" {i}", "personal" if personal else "common",
+                       _user(rnd, args.users) if personal else None)
+
+        insert("INSERT INTO smu_schedule (start_date, end_date, content, type, user_id) VALUES (%s, %s, %s, %s, %s)",
+               schedules())
+    conn.close()
+    return counts
+
+
+# ---- 툴별 인자 생성기 ----
+def _user(rnd, users):
+    return f"2023{rnd.randint(0, users - 1):05d}"
+
+
+def make_arg_generators(args, rnd: random.Random) -> dict:
+    today = date.today()
+
+    def day(spread=7):
+        return (today + timedelta(days=rnd.randint(-spread, spread))).isoformat()
+
+    def meal_range():
+        a, b = sorted([day(7), day(7)])
+        return {"start_date": a, "end_date": b}
+
+    delete_tokens: list[str] = []
+
+    gens = {
+        "now_kr": lambda: {},
+        "today_digest": lambda: {},
+        "query_special_keywords": lambda: {"keyword": rnd.choice(["김진석", "맹의현", "염다인", "김재관", "김정찬"])},
+        "query_smu_meals_by_date_category": lambda: {"date_iso": day(3), "category": rnd.choice(CATEGORIES)},
+        "query_smu_meals_by_keyword": lambda: {"keyword": rnd.choice(MEAL_WORDS)[: rnd.randint(1, 3)]},
+        "query_smu_notices_by_keyword": lambda: {"keyword": rnd.choice(NOTICE_WORDS)[: rnd.randint(1, 3)]},
+        "query_smu_exam": lambda: (
+            {"keyword": rnd.choice(SUBJECTS)[:2], "professor": rnd.choice(PROFESSORS)}
+            if rnd.random() < 0.3 else {"keyword": rnd.choice(SUBJECTS)[: rnd.randint(1, 4)]}
+        ),
+        "query_smu_schedule_by_keyword": lambda: {"keyword": rnd.choice(SCHEDULE_WORDS)[:2],
+                                                  "user_id": _user(rnd, args.users)},
+        "query_smu_schedule_by_date": lambda: {
+            "date_keyword": rnd.choice([day(30), "이번 주", "다음 주", f"{today.month}월", "오늘"]),
+            "user_id": _user(rnd, args.users),
+        },
+        "query_smu_meals_range": meal_range,
+        "add_smu_schedule_structured": lambda: {
+            "start_datetime": f"{day(30)} 10:00", "content": f"bench-{uuid.uuid4().hex[:12]}",
+            "user_id": "bench-user",
+        },
+        "add_smu_schedules_bulk": lambda: {
+            "entries": [{"start_datetime": day(30), "content": f"bench-{uuid.uuid4().hex[:12]}"} for _ in range(10)],
+            "user_id": "bench-user",
+        },
+        "delete_smu_schedule_by_content": lambda: {
+            "content_keyword": delete_tokens.pop() if delete_tokens else f"bench-missing-{uuid.uuid4().hex[:8]}",
+            "user_id": "bench-del",
+        },
+        "delete_smu_schedules_by_ids": lambda: {"ids": [rnd.randint(1, 10_000) for _ in range(5)],
+                                                "user_id": "bench-del"},
+    }
+    gens["_delete_tokens"] = delete_tokens
+    return gens
+
+
+def prepare_deletes(args, tokens: list[str], n: int) -> None:
+    """delete_smu_schedule_by_content가 매번 실제로 1건을 지우도록 대상 행을 미리 넣어 둔다"""
+    conn = _connect(args)
+    rows = []
+    for _ in range(n):
+        t = f"bench-del-{uuid.uuid4().hex}"
+        tokens.append(t)
+        rows.append((datetime.now(), datetime.now(), t, "personal", "bench-del"))
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO smu_schedule (start_date, end_date, content, type, user_id) VALUES (%s, %s, %s, %s, %s)", rows
+        )
+    conn.close()
+
+
+def _pct(values: list[float], p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return round(values[k], 3)
+
+
+def _summary(latencies, wall, errors, db_times=None, ser_times=None, sizes=None) -> dict:
+    out = {
+        "calls": len(latencies) + errors,
+        "errors": errors,
+        "latency_ms": {
+            "p50": _pct(latencies, 50), "p95": _pct(latencies, 95), "p99": _pct(latencies, 99),
+            "mean": round(statistics.fmean(latencies), 3) if latencies else None,
+            "max": round(max(latencies), 3) if latencies else None,
+        },
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else None,
+    }
+    if db_times is not None:
+        out["db_ms"] = {"p50": _pct(db_times, 50), "p95": _pct(db_times, 95),
+                        "mean": round(statistics.fmean(db_times), 3) if db_times else None}
+    if ser_times is not None:
+        out["serialize_ms"] = {"p50": _pct(ser_times, 50), "p95": _pct(ser_times, 95),
+                               "mean": round(statistics.fmean(ser_times), 3) if ser_times else None}
+    if sizes:
+        out["response_bytes"] = {"mean": round(statistics.fmean(sizes), 1), "max": max(sizes)}
+    return out
+
+
+def _server_env(args) -> dict:
+    env = dict(os.environ)
+    env.update({"DB_HOST": args.db_host, "DB_PORT": str(args.db_port), "DB_USER": args.db_user,
+                "DB_PASSWORD": args.db_password, "DB_NAME": args.db_name})
+    return env
+
+
+# ---- direct 모드 (워커 프로세스 안에서 실행) ----
+async def run_direct(args, tool: str) -> dict:
+    os.environ.update(_server_env(args))
+    sys.path.insert(0, HERE)
+    import pydantic_core
+    import lastdance1008 as server
+
+    # DB 시간: _run_db(스레드 풀로 넘기는 DB 작업)에 걸린 시간을 호출 단위로 합산
+    db_acc: contextvars.ContextVar = contextvars.ContextVar("bench_db_acc", default=None)
+    orig_run_db = server._run_db
+
+    async def timed_run_db(fn, *a, **kw):
+        t = time.perf_counter()
+        try:
+            return await orig_run_db(fn, *a, **kw)
+        finally:
+            acc = db_acc.get()
+            if acc is not None:
+                acc[0] += time.perf_counter() - t
+
+    server._run_db = timed_run_db
+    if args.warm:
+        server._start_background_jobs()
+        deadline = time.time() + 120
+        while time.time() < deadline and not all(i.loaded for i in server._SEARCH_INDEXES.values()):
+            await asyncio.sleep(0.2)
+
+    fn = server.mcp._tool_manager.get_tool(tool).fn
+    rnd = random.Random(args.seed)
+    gens = make_arg_generators(args, rnd)
+    if tool == "delete_smu_schedule_by_content":
+        prepare_deletes(args, gens["_delete_tokens"], args.requests)
+    gen = gens[tool]
+
+    latencies, db_times, ser_times, sizes = [], [], [], []
+    errors = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            acc = [0.0]
+            db_acc.set(acc)
+            call_args = gen()
+            t0 = time.perf_counter()
+            try:
+                result = fn(**call_args)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                t1 = time.perf_counter()
+                payload = pydantic_core.to_json(result, fallback=str)
+                t2 = time.perf_counter()
+            except Exception:
+                errors += 1
+                return
+            latencies.append((t2 - t0) * 1000)
+            db_times.append(acc[0] * 1000)
+            ser_times.append((t2 - t1) * 1000)
+            sizes.append(len(payload))
+
+    t = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    wall = time.perf_counter() - t
+    out = _summary(latencies, wall, errors, db_times, ser_times, sizes)
+    out["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return out
+
+
+# ---- http 모드 ----
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _vm_hwm_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+async def run_http(args, tool: str) -> dict:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    port = _free_port()
+    env = _server_env(args)
+    env["PORT"] = str(port)
+    proc = subprocess.Popen([sys.executable, SERVER_SCRIPT], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                await asyncio.sleep(0.2)
+        if args.warm:
+            await asyncio.sleep(args.warm_seconds)
+
+        rnd = random.Random(args.seed)
+        gens = make_arg_generators(args, rnd)
+        if tool == "delete_smu_schedule_by_content":
+            prepare_deletes(args, gens["_delete_tokens"], args.requests)
+        gen = gens[tool]
+        url = f"http://127.0.0.1:{port}/mcp"
+        latencies, sizes = [], []
+        errors = 0
+        per_session = [args.requests // args.concurrency + (1 if i < args.requests % args.concurrency else 0)
+                       for i in range(args.concurrency)]
+
+        async def session_worker(n):
+            nonlocal errors
+            if not n:
+                return
+            async with streamablehttp_client(url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    for _ in range(n):
+                        t0 = time.perf_counter()
+                        try:
+                            res = await session.call_tool(tool, gen())
+                        except Exception:
+                            errors += 1
+                            continue
+                        if res.isError:
+                            errors += 1
+                            continue
+                        latencies.append((time.perf_counter() - t0) * 1000)
+                        sizes.append(sum(len(getattr(c, "text", "") or "") for c in res.content))
+
+        t = time.perf_counter()
+        await asyncio.gather(*(session_worker(n) for n in per_session))
+        wall = time.perf_counter() - t
+        out = _summary(latencies, wall, errors, sizes=sizes)
+        out["peak_rss_mb"] = _vm_hwm_mb(proc.pid)
+        return out
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def worker_main(args) -> None:
+    runner = run_direct if args.mode == "direct" else run_http
+    result = asyncio.run(runner(args, args.tool))
+    print(json.dumps(result, ensure_ascii=False))
+
+
+# ---- 오케스트레이션 ----
+def list_tools(args) -> list[str]:
+    os.environ.update(_server_env(args))
+    sys.path.insert(0, HERE)
+    import lastdance1008 as server
+    return [t.name for t in server.mcp._tool_manager.list_tools()]
+
+
+def _worker_cmd(args, tool, mode, concurrency) -> list[str]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--tool", tool, "--mode", mode,
+           "--concurrency", str(concurrency), "--requests", str(args.requests), "--seed", str(args.seed),
+           "--users", str(args.users), "--db-host", args.db_host, "--db-port", str(args.db_port),
+           "--db-user", args.db_user, "--db-password", args.db_password, "--db-name", args.db_name,
+           "--warm-seconds", str(args.warm_seconds)]
+    if args.warm:
+        cmd.append("--warm")
+    return cmd
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    key = lambda r: (r["tool"], r["mode"], r["concurrency"])  # noqa: E731
+    before = {key(r): r for r in old.get("results", [])}
+    lines = []
+    for r in new.get("results", []):
+        o = before.get(key(r))
+        if not o or "latency_ms" not in o or "latency_ms" not in r:
+            continue
+        p50o, p50n = o["latency_ms"]["p50"], r["latency_ms"]["p50"]
+        rpso, rpsn = o.get("throughput_rps"), r.get("throughput_rps")
+        if p50o and p50n and rpso and rpsn:
+            lines.append(
+                f"{r['tool']:<36} {r['mode']:<6} c={r['concurrency']:<4} "
+                f"p50 {p50o:>9.2f} -> {p50n:>9.2f} ms ({(p50n - p50o) / p50o * 100:+.1f}%)  "
+                f"rps {rpso:>8.1f} -> {rpsn:>8.1f} ({(rpsn - rpso) / rpso * 100:+.1f}%)"
+            )
+    return lines
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="SMUS MCP server benchmark")
+    ap.add_argument("--scale", type=int, default=10_000, help="smu_notices 행 수 (다른 테이블은 비율로 결정)")
+    ap.add_argument("--concurrency", default="1,16,64", help="쉼표로 구분한 동시성 수준")
+    ap.add_argument("--requests", type=int, default=200, help="툴/모드/동시성 조합당 호출 수")
+    ap.add_argument("--modes", default="direct,http")
+    ap.add_argument("--tools", default="", help="쉼표로 구분한 툴 이름 (기본: 전체)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--users", type=int, default=500, help="합성 user_id(학번) 수")
+    ap.add_argument("--no-seed", dest="do_seed", action="store_false", help="기존 데이터 재사용")
+    ap.add_argument("--start-mysql", action="store_true", help=f"docker로 {MYSQL_IMAGE} 컨테이너 기동")
+    ap.add_argument("--warm", action=argparse.BooleanOptionalAction, default=True,
+                    help="측정 전 캐시/검색 인덱스 적재 (운영과 같은 상태)")
+    ap.add_argument("--warm-seconds", type=float, default=5.0, help="http 모드 서버 워밍업 대기(초)")
+    ap.add_argument("--db-host", default=os.getenv("BENCH_DB_HOST", "127.0.0.1"))
+    ap.add_argument("--db-port", type=int, default=int(os.getenv("BENCH_DB_PORT", "3307")))
+    ap.add_argument("--db-user", default=os.getenv("BENCH_DB_USER", "root"))
+    ap.add_argument("--db-password", default=os.getenv("BENCH_DB_PASSWORD", "bench"))
+    ap.add_argument("--db-name", default=os.getenv("BENCH_DB_NAME", "smus_bench"))
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    # 내부용: 툴 하나를 별도 프로세스에서 측정
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--tool", help=argparse.SUPPRESS)
+    ap.add_argument("--mode", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        args.concurrency = int(args.concurrency)
+        worker_main(args)
+        return
+
+    if args.start_mysql:
+        start_mysql(args)
+    counts = seed(args) if args.do_seed else None
+
+    tools = [t for t in args.tools.split(",") if t] or list_tools(args)
+    known = make_arg_generators(args, random.Random(0))
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    modes = [m for m in args.modes.split(",") if m]
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "rows": counts,
+            "requests": args.requests,
+            "concurrency": levels,
+            "modes": modes,
+            "warm": args.warm,
+            "python": platform.python_version(),
+            "git_rev": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                      capture_output=True, text=True).stdout.strip() or None,
+        },
+        "results": [],
+    }
+    for tool in tools:
+        if tool not in known:
+            report["results"].append({"tool": tool, "skipped": "no argument generator in bench_smus.py"})
+            print(f"[skip] {tool}: no argument generator", file=sys.stderr)
+            continue
+        for mode in modes:
+            for c in levels:
+                proc = subprocess.run(_worker_cmd(args, tool, mode, c), capture_output=True, text=True)
+                row = {"tool": tool, "mode": mode, "concurrency": c}
+                try:
+                    row.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                except (IndexError, json.JSONDecodeError):
+                    row["failed"] = proc.stderr.strip().splitlines()[-1:] or ["no output"]
+                report["results"].append(row)
+                lat = row.get("latency_ms", {})
+                print(f"{tool:<36} {mode:<6} c={c:<4} p50={lat.get('p50')} p99={lat.get('p99')} "
+                      f"rps={row.get('throughput_rps')} err={row.get('errors')}", file=sys.stderr)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            for line in compare(json.load(f), report):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,332 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()  # import → ready 시간 측정용 (무거운 import보다 먼저)
+
 from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp.prompts import base
+from mcp.types import CallToolResult, TextContent
+import asyncio
+import base64
+import contextvars
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import logging
 import os
-import pandas as pd
+import re
+import sqlite3
+import threading
+import unicodedata
+import weakref
+import pydantic_core
 import pymysql
-from datetime import datetime, timedelta
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from zoneinfo import ZoneInfo
-from pymysql.cursors import DictCursor
-from typing import Optional
+from pymysql.constants import FIELD_TYPE, SERVER_STATUS
+from pymysql.cursors import DictCursor, SSDictCursor
+from typing import Iterable, Optional
+from pydantic import AnyUrl
+
+logger = logging.getLogger("smus")
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """'1'/'true'/'yes'/'on' 형태의 환경변수를 bool로 해석"""
+    v = os.getenv(name)
+    if v is None or not v.strip():
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---- 메트릭 (Prometheus 텍스트 포맷) ----
+# 툴 호출 수/에러 수, 단계별(커넥션 획득/쿼리/페치/직렬화) 지연, 행 수, 응답 바이트를 수집해 /metrics로 노출.
+# 외부 라이브러리 없이 카운터/히스토그램만 직접 구현한다.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))             # 이 시간(ms)을 넘는 쿼리는 SQL과 함께 경고 로그
+METRICS_SESSION_LABELS = _env_flag("METRICS_SESSION_LABELS", False)  # 세션별 레이블(mcp-session-id) — 카디널리티 주의
+METRICS_USER_LABELS = _env_flag("METRICS_USER_LABELS", False)        # user_id별 레이블 — 카디널리티 주의
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000, 5000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _label_str(labels: tuple) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_label_str(k)} {v:g}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[0][i] += 1
+            data[1] += value
+            data[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(d[0]), d[1], d[2])) for k, d in self._values.items()]
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', f'{bound:g}'),))} {c}")
+            lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {total:g}")
+            lines.append(f"{self.name}_count{_label_str(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """카운터/히스토그램 + 스크레이프 시점에 값을 읽는 게이지 수집기(collector)"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def collector(self, fn):
+        """fn() -> [(name, help, [(labels_dict, value), ...]), ...] 형태의 게이지 수집 함수 등록 (데코레이터)"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            try:
+                gauges = fn()
+            except Exception as e:
+                logger.warning("metrics collector %s failed: %s", getattr(fn, "__name__", fn), e)
+                continue
+            for name, help_text, samples in gauges:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_label_str(tuple(sorted(labels.items())))} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+_TOOL_CALLS = METRICS.counter("smus_tool_calls_total", "Tool calls by tool and status (ok|error).")
+_TOOL_LATENCY = METRICS.histogram("smus_tool_latency_seconds", "End-to-end tool call latency.")
+_TOOL_PHASE = METRICS.histogram(
+    "smus_tool_phase_seconds", "Per-call time spent in connect|query|fetch|serialize phases."
+)
+_TOOL_ROWS = METRICS.histogram("smus_tool_rows", "Rows fetched from the DB per tool call.", ROW_BUCKETS)
+_TOOL_BYTES = METRICS.histogram(
+    "smus_tool_response_bytes", "Serialized response size per tool call (by response format).", BYTE_BUCKETS
+)
+_SLOW_QUERIES = METRICS.counter("smus_slow_queries_total", "Queries slower than SLOW_QUERY_MS.")
+_QUERY_TIMEOUTS = METRICS.counter(
+    "smus_query_timeouts_total",
+    "Queries stopped by MAX_EXECUTION_TIME (kind=server) or by the client read_timeout (kind=client).",
+)
+
+
+class _CallStats:
+    """툴 호출 하나의 단계별 누적 시간/행 수 (contextvar로 DB 스레드까지 전달)"""
+    __slots__ = ("tool", "phases", "rows", "meta", "format")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.phases = {"connect": 0.0, "query": 0.0, "fetch": 0.0, "serialize": 0.0}
+        self.rows = 0
+        self.meta: dict = {}  # 응답 _meta로 붙일 값 (예: 스냅샷 시점)
+        self.format = "rows"  # 응답 포맷 (rows 이외면 사전 인코딩)
+
+
+_CALL_STATS: contextvars.ContextVar[Optional[_CallStats]] = contextvars.ContextVar("smus_call_stats", default=None)
+
+
+def _note_response_meta(key: str, value) -> None:
+    stats = _CALL_STATS.get()
+    if stats is not None:
+        stats.meta[key] = value
+
+
+def _record_phase(phase: str, seconds: float, rows: int = 0) -> None:
+    stats = _CALL_STATS.get()
+    if stats is not None:
+        stats.phases[phase] += seconds
+        stats.rows += rows
+
+
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+def _with_execution_limit(query):
+    """읽기 SELECT에 MAX_EXECUTION_TIME 옵티마이저 힌트를 붙인다 (잠금 조회/쓰기문은 그대로)"""
+    if (
+        QUERY_MAX_EXECUTION_MS <= 0
+        or not isinstance(query, str)
+        or not _SELECT_RE.match(query)
+        or "MAX_EXECUTION_TIME" in query
+        or "FOR UPDATE" in query.upper()
+    ):
+        return query
+    return _SELECT_RE.sub(lambda m: f"{m.group(0)} /*+ MAX_EXECUTION_TIME({QUERY_MAX_EXECUTION_MS}) */", query, count=1)
+
+
+def _query_timeout_kind(e: Exception) -> Optional[str]:
+    """쿼리 시간 제한에 걸린 오류면 'server'(MAX_EXECUTION_TIME) / 'client'(read_timeout), 아니면 None"""
+    if not isinstance(e, pymysql.OperationalError) or not e.args:
+        return None
+    if e.args[0] == 3024:
+        return "server"
+    if e.args[0] == 2013 and "timed out" in str(e.args[-1]):
+        return "client"
+    return None
+
+
+def _count_query_timeout(e: Exception) -> None:
+    kind = _query_timeout_kind(e)
+    if kind is not None:
+        stats = _CALL_STATS.get()
+        _QUERY_TIMEOUTS.inc(tool=stats.tool if stats else "-", kind=kind)
+
+
+class _TimedCursorMixin:
+    """
+    execute/fetch* 시간을 현재 툴 호출의 query/fetch 단계로 기록하고, 느린 쿼리는 SQL과 함께 로그.
+    SELECT에는 MAX_EXECUTION_TIME 힌트를 붙이고(execution_limit=False면 생략), 시간 제한에 걸린 쿼리는 카운트한다.
+    """
+
+    execution_limit = True
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(_with_execution_limit(query) if self.execution_limit else query, args)
+        except pymysql.OperationalError as e:
+            _count_query_timeout(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _record_phase("query", elapsed)
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                stats = _CALL_STATS.get()
+                tool = stats.tool if stats else "-"
+                _SLOW_QUERIES.inc(tool=tool)
+                logger.warning(
+                    "slow query %.0fms (tool=%s): %s", elapsed * 1000, tool, " ".join(str(query).split())[:1000]
+                )
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        _record_phase("fetch", time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        _record_phase("fetch", time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            rows = super().fetchall()
+        except pymysql.OperationalError as e:
+            _count_query_timeout(e)  # 비버퍼 커서는 행을 읽는 도중에도 시간 제한에 걸릴 수 있다
+            raise
+        _record_phase("fetch", time.perf_counter() - started, len(rows))
+        return rows
+
+
+class TimedDictCursor(_TimedCursorMixin, DictCursor):
+    """버퍼링 커서: 결과 전송은 execute 안에서 끝나므로 대부분 query 단계로 잡힌다"""
+
+
+class TimedSSDictCursor(_TimedCursorMixin, SSDictCursor):
+    """비버퍼 커서: 행 전송 시간이 fetch 단계로 분리되어 잡힌다"""
+
+
+class BackgroundDictCursor(TimedDictCursor):
+    """백그라운드 색인/스냅샷 적재용: 테이블 전체 스캔이 툴 호출용 시간 제한(3024)에 끊기지 않도록 힌트 없음"""
+
+    execution_limit = False
+
+
+class BackgroundSSDictCursor(TimedSSDictCursor):
+    """BackgroundDictCursor의 비버퍼 버전"""
+
+    execution_limit = False
+
 
 # ---- DB 설정 (가능하면 환경변수로 관리 권장) ----
 # Smithery에서 URL 파라미터로 전달되는 설정을 환경변수로 변환
+_DB_PORT_RAW = os.getenv("DB_PORT")
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_NAME"),
+    # 잘못된 DB_PORT로 import 단계에서 죽지 않도록 기본값 사용 (기동 시 _validate_db_config가 보고)
+    "port": int(_DB_PORT_RAW) if (_DB_PORT_RAW or "").strip().isdigit() else 3306,
+}
 
 DB_HOST = DB_CONFIG["host"]
 DB_USER = DB_CONFIG["user"]
@@ -17,23 +334,883 @@ DB_PASSWORD = DB_CONFIG["password"]
 DB_NAME = DB_CONFIG["database"]
 DB_PORT = DB_CONFIG["port"]
 
+# ---- 커넥션 풀 설정 ----
+# 매 호출마다 TCP+TLS+인증 핸드셰이크를 하지 않도록 프로세스 전역 풀을 사용
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))                # 최대 동시 커넥션 수
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))        # 체크아웃 대기 한도(초)
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "300"))       # 유휴 커넥션 재활용 기준(초)
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))  # 커넥션 최대 수명(초)
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "10"))  # 이 시간 이상 쉰 커넥션은 체크아웃 시 ping
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", "2"))                 # 시작 시 미리 열어 둘 커넥션 수
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_READ_TIMEOUT = int(os.getenv("DB_READ_TIMEOUT", "30"))             # 소켓 읽기 한도(초) — 응답 없는 쿼리에 커넥션이 묶이지 않도록
+DB_WRITE_TIMEOUT = int(os.getenv("DB_WRITE_TIMEOUT", "30"))
+QUERY_MAX_EXECUTION_MS = int(os.getenv("QUERY_MAX_EXECUTION_MS", "15000"))  # SELECT에 MAX_EXECUTION_TIME 힌트(0이면 끔)
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    스레드 안전한 pymysql 커넥션 풀.
+    - 체크아웃 시 일정 시간 이상 유휴였던 커넥션은 ping으로 상태 확인
+    - 유휴 시간(recycle) / 최대 수명(max_lifetime)을 넘긴 커넥션은 폐기 후 재생성
+    - stats()로 사용 중/유휴/대기 시간 등 통계 제공
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        size: int = DB_POOL_SIZE,
+        timeout: float = DB_POOL_TIMEOUT,
+        recycle: float = DB_POOL_RECYCLE,
+        max_lifetime: float = DB_POOL_MAX_LIFETIME,
+        ping_after: float = DB_POOL_PING_AFTER,
+    ):
+        self.config = config
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._idle: deque[_PooledConnection] = deque()
+        self._cond = threading.Condition()
+        self._opened = 0
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "timeouts": 0,
+            "wait_time_total_s": 0.0,
+            "wait_time_max_s": 0.0,
+        }
+
+    def _connect(self) -> _PooledConnection:
+        cfg = self.config
+        if not all([cfg.get("host"), cfg.get("user"), cfg.get("password"), cfg.get("database")]):
+            raise RuntimeError("DB env vars not set: DB_HOST/DB_USER/DB_PASSWORD/DB_NAME")
+        conn = pymysql.connect(
+            host=cfg["host"], user=cfg["user"], password=cfg["password"],
+            database=cfg["database"], port=cfg["port"], cursorclass=TimedDictCursor,
+            charset="utf8mb4", autocommit=True, connect_timeout=DB_CONNECT_TIMEOUT,
+            read_timeout=DB_READ_TIMEOUT or None, write_timeout=DB_WRITE_TIMEOUT or None,
+        )
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(conn)
+
+    def _expired(self, pc: _PooledConnection, now: float) -> bool:
+        return (now - pc.last_used) > self.recycle or (now - pc.created_at) > self.max_lifetime
+
+    @staticmethod
+    def _close_quietly(pc: _PooledConnection) -> None:
+        try:
+            pc.conn.close()
+        except Exception:
+            pass
+
+    def _forget(self, pc: _PooledConnection) -> None:
+        # 열린 커넥션 수에서 제외하고 대기자를 깨운다
+        self._close_quietly(pc)
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    def acquire(self) -> _PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            pc = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._idle:
+                        pc = self._idle.pop()  # LIFO: 가장 최근에 쓴(따뜻한) 커넥션 우선
+                        break
+                    if self._opened < self.size:
+                        self._opened += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise RuntimeError(
+                            f"DB connection pool exhausted (size={self.size}, waited {self.timeout:.1f}s)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if create:
+                try:
+                    pc = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._opened -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._expired(pc, now):
+                    with self._cond:
+                        self._stats["recycled"] += 1
+                    self._forget(pc)
+                    continue
+                if now - pc.last_used >= self.ping_after:
+                    try:
+                        pc.conn.ping(reconnect=False)
+                    except Exception:
+                        with self._cond:
+                            self._stats["health_check_failures"] += 1
+                        self._forget(pc)
+                        continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total_s"] += waited
+                if waited > self._stats["wait_time_max_s"]:
+                    self._stats["wait_time_max_s"] = waited
+            return pc
+
+    def release(self, pc: _PooledConnection, discard: bool = False) -> None:
+        if discard or not pc.conn.open:
+            self._forget(pc)
+            return
+        if pc.conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            # commit/rollback 없이 반납된 트랜잭션은 다음 사용자에게 넘기지 않는다
+            try:
+                pc.conn.rollback()
+            except Exception:
+                self._forget(pc)
+                return
+        pc.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pc)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        pc = self.acquire()
+        _record_phase("connect", time.perf_counter() - started)
+        discard = False
+        try:
+            yield pc.conn
+        except BaseException:
+            # 트랜잭션 도중 실패했다면 롤백, 롤백마저 실패하면 커넥션 폐기
+            try:
+                pc.conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(pc, discard=discard)
+
+    def warm(self, count: int) -> int:
+        """커넥션을 미리 count개(최대 size) 열어 유휴 목록에 둔다 — 첫 요청이 접속/인증 비용을 내지 않도록"""
+        held = []
+        try:
+            for _ in range(min(count, self.size)):
+                held.append(self.acquire())
+        finally:
+            for pc in held:
+                self.release(pc)
+        return len(held)
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._opened -= len(idle)
+        for pc in idle:
+            self._close_quietly(pc)
+
+    def stats(self) -> dict:
+        with self._cond:
+            s = dict(self._stats)
+            idle = len(self._idle)
+            s.update(
+                size=self.size,
+                opened=self._opened,
+                idle=idle,
+                in_use=self._opened - idle,
+                waiting=self._waiting,
+                wait_time_avg_ms=(s["wait_time_total_s"] / s["checkouts"] * 1000) if s["checkouts"] else 0.0,
+            )
+        return s
+
+
+_POOL = ConnectionPool(DB_CONFIG)
+
+# ---- 읽기 레플리카 ----
+# DB_READ_HOSTS='replica1:3306,replica2' 처럼 지정하면 읽기 전용 툴(과 인덱스/스냅샷 갱신)은 레플리카로 보낸다.
+# 계정/DB 이름은 프라이머리(DB_*)와 같다고 가정. 레플리카 접속이 실패하면 down 표시 후 프라이머리에서 다시 실행하고,
+# 헬스 체크가 다시 살아난 것을 확인하면 복귀시킨다. 쓰기는 항상 프라이머리.
+DB_READ_HOSTS = [h.strip() for h in os.getenv("DB_READ_HOSTS", "").split(",") if h.strip()]
+DB_READ_STRATEGY = os.getenv("DB_READ_STRATEGY", "round_robin").strip().lower()  # round_robin | least_latency
+DB_READ_HEALTH_INTERVAL = float(os.getenv("DB_READ_HEALTH_INTERVAL", "10"))      # 헬스 체크 주기(초)
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "10"))      # 쓰기 직후 해당 user_id 일정 읽기는 프라이머리(초)
+
+_READ_ROUTES = METRICS.counter(
+    "smus_db_read_route_total",
+    "Read routing decisions (target=replica|primary, reason=replica|no_replica|read_your_writes|fallback).",
+)
+
+
+def _is_connection_error(e: Exception) -> bool:
+    """접속/연결 끊김류 오류인지 (SQL 오류와 구분: 클라이언트 오류 코드 2000번대 또는 InterfaceError)"""
+    if isinstance(e, pymysql.InterfaceError):
+        return True
+    if _query_timeout_kind(e) is not None:
+        return False  # 느린 쿼리를 다른 서버에서 한 번 더 돌리지 않는다
+    return isinstance(e, pymysql.OperationalError) and bool(e.args) and isinstance(e.args[0], int) and 2000 <= e.args[0] < 3000
+
+
+class _Replica:
+    def __init__(self, spec: str):
+        host, _, port = spec.partition(":")
+        self.name = spec
+        self.pool = ConnectionPool({**DB_CONFIG, "host": host, "port": int(port) if port else DB_CONFIG["port"]})
+        self.healthy = True  # 첫 헬스 체크 전에는 사용 가능하다고 가정 (실패하면 바로 down)
+        self.latency: Optional[float] = None  # 초, EWMA
+        self.last_error: Optional[str] = None
+
+    def mark_down(self, error: Exception) -> None:
+        if self.healthy:
+            logger.warning("read replica %s marked down: %s", self.name, error)
+        self.healthy = False
+        self.last_error = str(error)
+
+    def check(self) -> None:
+        started = time.perf_counter()
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                    cur.fetchall()
+        except Exception as e:
+            self.mark_down(e)
+            return
+        elapsed = time.perf_counter() - started
+        self.latency = elapsed if self.latency is None else 0.7 * self.latency + 0.3 * elapsed
+        if not self.healthy:
+            logger.info("read replica %s is back (%.1fms)", self.name, elapsed * 1000)
+        self.healthy = True
+        self.last_error = None
+
+
+class ReplicaRouter:
+    """
+    레플리카 선택 + read-your-writes.
+    - pick(): 정상 레플리카 중 round_robin 또는 least_latency(EWMA)로 하나, 없으면 None(프라이머리)
+    - note_write(user_id): 이후 READ_YOUR_WRITES_WINDOW 동안 그 user_id의 읽기는 프라이머리
+    """
+
+    def __init__(self, hosts: list[str], strategy: str = DB_READ_STRATEGY):
+        self.replicas = [_Replica(h) for h in hosts]
+        self.strategy = strategy
+        self._rr = 0
+        self._lock = threading.Lock()
+        self._recent_writes: dict[str, float] = {}
+
+    def note_write(self, user_id: Optional[str]) -> None:
+        if not user_id or not self.replicas or READ_YOUR_WRITES_WINDOW <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[str(user_id)] = now + READ_YOUR_WRITES_WINDOW
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {u: t for u, t in self._recent_writes.items() if t > now}
+
+    def _wrote_recently(self, user_id: Optional[str]) -> bool:
+        if not user_id:
+            return False
+        with self._lock:
+            deadline = self._recent_writes.get(str(user_id))
+            return deadline is not None and deadline > time.monotonic()
+
+    def pick(self, user_id: Optional[str] = None) -> tuple[Optional[_Replica], str]:
+        if not self.replicas:
+            return None, "no_replica"
+        if self._wrote_recently(user_id):
+            return None, "read_your_writes"
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None, "no_replica"
+        if self.strategy == "least_latency":
+            return min(healthy, key=lambda r: r.latency if r.latency is not None else 0.0), "replica"
+        with self._lock:
+            self._rr += 1
+            return healthy[self._rr % len(healthy)], "replica"
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "host": r.name, "healthy": r.healthy, "latency_ms": None if r.latency is None else r.latency * 1000,
+                "last_error": r.last_error, "pool": r.pool.stats(),
+            }
+            for r in self.replicas
+        ]
+
+
+_REPLICAS = ReplicaRouter(DB_READ_HOSTS)
+
+# 현재 스레드(컨텍스트)의 커넥션 대상 — None이면 프라이머리
+_CONN_TARGET: contextvars.ContextVar[Optional[_Replica]] = contextvars.ContextVar("smus_conn_target", default=None)
+
+
+def _read_on_replica(fn, *args, user_id: Optional[str] = None):
+    """
+    읽기 전용 함수 fn을 레플리카 커넥션으로 실행한다 (fn 안의 _get_conn()이 레플리카 풀을 사용).
+    레플리카 접속 오류면 down 표시 후 프라이머리에서 한 번 더 실행.
+    """
+    replica, reason = _REPLICAS.pick(user_id)
+    if replica is not None:
+        token = _CONN_TARGET.set(replica)
+        try:
+            result = fn(*args)
+            _READ_ROUTES.inc(target="replica", reason=reason)
+            return result
+        except Exception as e:
+            if not _is_connection_error(e):
+                raise
+            replica.mark_down(e)
+            reason = "fallback"
+        finally:
+            _CONN_TARGET.reset(token)
+    _READ_ROUTES.inc(target="primary", reason=reason)
+    return fn(*args)
+
+
+def _replica_health_loop() -> None:
+    while True:
+        _REPLICAS.check_all()
+        time.sleep(DB_READ_HEALTH_INTERVAL)
+
+# ---- 비동기 실행 설정 ----
+# pymysql은 블로킹 I/O이므로 툴의 DB 작업은 이벤트 루프가 아닌 전용 스레드 풀에서 실행한다.
+# (streamable-http 서버에서 느린 쿼리 하나가 다른 세션을 멈추지 않도록)
+# 기본값은 풀 크기와 동일: 워커가 커넥션을 기다리며 노는 일이 없도록
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, DB_EXECUTOR_WORKERS), thread_name_prefix="smus-db")
+
+
+async def _run_db(fn, *args, **kwargs):
+    """블로킹 DB 함수를 전용 스레드 풀에서 실행하고 결과를 await 한다."""
+    loop = asyncio.get_running_loop()
+    # 현재 툴 호출의 메트릭 컨텍스트(_CALL_STATS)가 DB 스레드에서도 보이도록 컨텍스트를 복사해 실행
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_DB_EXECUTOR, ctx.run, functools.partial(fn, *args, **kwargs))
+
+
+# ---- 동일 요청 병합 (single-flight) ----
+# 점심 직전처럼 같은 인자의 조회가 동시에 몰릴 때, 진행 중인 DB 작업 하나를 모든 호출이 공유한다.
+# 캐시와 별개이므로 캐시가 비어 있거나(콜드) 꺼져 있어도 DB에는 같은 쿼리가 한 번만 나간다.
+SINGLE_FLIGHT_ENABLED = _env_flag("SINGLE_FLIGHT_ENABLED", True)
+
+_SF_LEADERS = METRICS.counter("smus_singleflight_leaders_total", "Read calls that actually ran a DB query.")
+_SF_COLLAPSED = METRICS.counter(
+    "smus_singleflight_collapsed_total", "Read calls that joined an identical in-flight query instead of running it."
+)
+
+
+class SingleFlight:
+    """
+    key별 진행 중인 작업(asyncio.Future) 테이블. 이벤트 루프 스레드에서만 사용한다.
+    - 첫 호출(리더)이 작업을 시작하고, 같은 key의 후속 호출은 그 결과(또는 예외)를 함께 받는다
+    - 작업이 끝나면 테이블에서 빠지므로 이후 호출은 새로 조회한다 (결과를 보관하지 않음)
+    - 리더가 취소돼도 작업은 계속 진행되어 기다리던 다른 호출이 결과를 받는다
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+
+    async def run(self, key: tuple, factory):
+        fut = self._inflight.get(key)
+        if fut is not None and not fut.done():
+            _SF_COLLAPSED.inc(tool=key[0])
+            return await asyncio.shield(fut)
+
+        _SF_LEADERS.inc(tool=key[0])
+        fut = asyncio.ensure_future(factory())
+        self._inflight[key] = fut
+
+        def _done(f):
+            if self._inflight.get(key) is f:
+                del self._inflight[key]
+            if not f.cancelled():
+                f.exception()  # 기다리는 호출이 없어도 'exception was never retrieved' 경고가 나지 않도록
+
+        fut.add_done_callback(_done)
+        return await asyncio.shield(fut)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+
+_SINGLE_FLIGHT = SingleFlight()
+
+
+async def _run_db_shared(key: tuple, fn, *args, user_id: Optional[str] = None):
+    """
+    읽기 전용 fn을 레플리카(있으면)에서 실행하되, 같은 key로 진행 중인 호출이 있으면 그 결과를 공유한다.
+    key는 (이름, 정규화된 인자...) 형태의 hashable 튜플. 결과 객체는 호출들 사이에 공유되므로 변경하지 않는다.
+    user_id: 개인 일정을 읽는 경우 — 방금 쓴 사용자면 read-your-writes를 위해 프라이머리에서 읽는다.
+    """
+    if not SINGLE_FLIGHT_ENABLED:
+        return await _run_db(_read_on_replica, fn, *args, user_id=user_id)
+    leader = _CALL_STATS.get()
+    result, meta, rows = await _SINGLE_FLIGHT.run(key, lambda: _shared_db_job(leader, fn, *args, user_id=user_id))
+    # 응답 _meta(스냅샷 시점 등)와 행 수는 리더뿐 아니라 결과를 함께 받은 모든 호출에 반영
+    stats = _CALL_STATS.get()
+    if stats is not None:
+        stats.meta.update(meta)
+        stats.rows += rows
+    return result
+
+
+async def _shared_db_job(leader: Optional[_CallStats], fn, *args, user_id: Optional[str] = None) -> tuple:
+    """
+    single-flight로 공유되는 DB 작업. 리더의 컨텍스트가 아닌 전용 _CallStats에 모아 (결과, meta, 행 수)를 반환하고,
+    단계별 시간(connect/query/fetch)은 실제로 쿼리를 실행한 리더에게만 더한다.
+    """
+    stats = _CallStats(leader.tool if leader is not None else "shared")
+    token = _CALL_STATS.set(stats)
+    try:
+        result = await _run_db(_read_on_replica, fn, *args, user_id=user_id)
+    finally:
+        _CALL_STATS.reset(token)
+        if leader is not None:
+            for phase, seconds in stats.phases.items():
+                leader.phases[phase] += seconds
+    return result, dict(stats.meta), stats.rows
+
+
+# ---- 페이지네이션 / 컬럼 선택 ----
+# 키워드 한 글자('학')로 수천 행 * 긴 본문이 한 번에 직렬화되지 않도록 서버가 페이지 크기를 강제한다.
+# 응답: { rows, count, has_more, next_cursor } — next_cursor를 그대로 cursor로 넘기면 다음 페이지
+PAGE_DEFAULT_ROWS = int(os.getenv("PAGE_DEFAULT_ROWS", "20"))
+PAGE_MAX_ROWS = int(os.getenv("PAGE_MAX_ROWS", "100"))
+
+_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return PAGE_DEFAULT_ROWS
+    return max(1, min(int(limit), PAGE_MAX_ROWS))
+
+
+def _encode_cursor(src: str, key: list) -> str:
+    """키셋 커서: 마지막 행의 정렬 키를 url-safe base64(JSON)로 인코딩. src는 'sql' | 'idx'"""
+    payload = json.dumps({"src": src, "k": key}, ensure_ascii=False, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[tuple[str, list]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return payload["src"], list(payload["k"])
+    except Exception:
+        raise ValueError("Invalid cursor. Use the next_cursor value from a previous response.")
+
+
+def _check_fields(fields: Optional[list[str]]) -> Optional[list[str]]:
+    if not fields:
+        return None
+    bad = [f for f in fields if not isinstance(f, str) or not _IDENT_RE.match(f)]
+    if bad:
+        raise ValueError(f"Invalid field names: {bad}")
+    return list(dict.fromkeys(fields))
+
+
+def _project(rows: list[dict], fields: Optional[list[str]], columns=None) -> list[dict]:
+    """
+    fields만 남긴다. 행(또는 columns)에 없는 컬럼이면 SQL 경로(1054)와 같은 오류를 낸다
+    — 색인/캐시가 답해도 같은 인자에 같은 결과가 나오도록.
+    """
+    if not fields:
+        return rows
+    if columns is None and rows:
+        columns = rows[0]
+    if columns is not None and any(f not in columns for f in fields):
+        raise ValueError(f"Unknown field in fields: {fields}")
+    return [{f: row.get(f) for f in fields} for row in rows]
+
+
+def _page(
+    rows: list[dict], has_more: bool, next_cursor: Optional[str], fields: Optional[list[str]] = None, columns=None
+) -> dict:
+    rows = _project(rows, fields, columns)
+    return {"rows": rows, "count": len(rows), "has_more": has_more, "next_cursor": next_cursor}
+
+
+def _page_flight_key(name: str, *args, limit: Optional[int], cursor: Optional[str], fields: Optional[list[str]]) -> tuple:
+    """페이지 조회의 single-flight key (limit은 서버 상한 적용 후 값, fields는 순서 유지 튜플)"""
+    return (name, *args, _clamp_limit(limit), cursor or None, tuple(fields) if fields else None)
+
+
+# ---- 응답 포맷 (rows | columnar | compact) ----
+# 기본(rows)은 행마다 dict — 모든 행이 컬럼 이름을 반복하고, 결과가 들여쓰기된 JSON으로 직렬화된다.
+# 큰 검색 결과에서 토큰/바이트를 줄이도록 조회 툴에 format 인자를 둔다.
+# - columnar: { columns: [...], rows: [[...], ...] } — 컬럼 이름은 한 번만
+# - compact:  행 dict에서 null/빈 값 제거, 긴 텍스트는 COMPACT_TEXT_MAX자로 자름
+# rows 이외의 포맷은 들여쓰기 없이 pydantic_core(to_json)로 한 번에 인코딩해 그대로 응답한다.
+RESPONSE_FORMATS = ("rows", "columnar", "compact")
+COMPACT_TEXT_MAX = int(os.getenv("COMPACT_TEXT_MAX", "200"))
+
+
+def _check_format(format: Optional[str]) -> str:
+    fmt = (format or "rows").strip().lower()
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"Invalid format: {format!r}. Use one of {list(RESPONSE_FORMATS)}.")
+    return fmt
+
+
+def _compact_value(value):
+    if isinstance(value, str) and len(value) > COMPACT_TEXT_MAX and not value.startswith(("http://", "https://")):
+        return value[:COMPACT_TEXT_MAX] + "…"
+    return value
+
+
+def _shape_rows(rows: list[dict], fmt: str):
+    """행 목록을 포맷에 맞게 변환 (입력 행은 캐시/single-flight가 공유하므로 수정하지 않는다)"""
+    if fmt == "columnar":
+        columns = list(dict.fromkeys(k for row in rows for k in row))
+        return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in rows]}
+    if fmt == "compact":
+        return [
+            {k: _compact_value(v) for k, v in row.items() if v is not None and v != "" and v != [] and v != {}}
+            for row in rows
+        ]
+    return rows
+
+
+def _shape_page(page: dict, fmt: str) -> dict:
+    """{ rows, count, ... } 페이지의 rows만 변환 (columnar면 columns 키가 추가된다)"""
+    if fmt == "rows":
+        return page
+    shaped = _shape_rows(page["rows"], fmt)
+    if fmt == "columnar":
+        return {**page, **shaped}
+    return {**page, "rows": shaped}
+
+
+def _respond(result, fmt: str):
+    """툴 반환 직전에 호출: 이번 호출의 응답 포맷을 기록 (rows 이외면 _encode_result로 사전 인코딩)"""
+    stats = _CALL_STATS.get()
+    if stats is not None:
+        stats.format = fmt
+    return result
+
+
+def _keyset_equal(col: str, value) -> tuple[str, list]:
+    if value is None:
+        return f"`{col}` IS NULL", []
+    return f"`{col}` = %s", [value]
+
+
+def _keyset_after(col: str, direction: str, value) -> tuple[str, list]:
+    """정렬 방향 기준으로 value '다음' 값 조건. NULL은 가장 작은 값 (MySQL/SQLite 정렬, 캐시의 datetime.min과 동일)"""
+    if direction == "ASC":
+        if value is None:
+            return f"`{col}` IS NOT NULL", []
+        return f"`{col}` > %s", [value]
+    if value is None:
+        return "1 = 0", []
+    return f"(`{col}` < %s OR `{col}` IS NULL)", [value]
+
+
+def _keyset_clause(order: list[tuple[str, str]], after: list) -> tuple[str, list]:
+    """
+    ORDER BY (c1, c2, ...) 기준으로 after 키 '다음' 행만 고르는 조건: (c1 > v1) OR (c1 = v1 AND c2 > v2) ...
+    - 키 값이 NULL이면 IS NULL / IS NOT NULL로 바꿔 쓴다 (= NULL 비교는 항상 거짓이라 행이 누락됨)
+    - <=> 대신 분기하는 이유: 같은 조건을 SQLite 스냅샷에서도 실행한다
+    """
+    parts, args = [], []
+    for i, (col, direction) in enumerate(order):
+        conds = []
+        for (c, _), v in zip(order[:i], after):
+            cond, cond_args = _keyset_equal(c, v)
+            conds.append(cond)
+            args.extend(cond_args)
+        cond, cond_args = _keyset_after(col, direction, after[i])
+        conds.append(cond)
+        args.extend(cond_args)
+        parts.append("(" + " AND ".join(conds) + ")")
+    return "(" + " OR ".join(parts) + ")", args
+
+
+def _check_cursor(decoded: Optional[tuple[str, list]], src: str, arity: int) -> Optional[tuple[str, list]]:
+    """커서 출처와 키 개수가 이번 조회의 정렬 키와 맞는지 확인 (다른 툴/예전 정렬의 커서 거부)"""
+    if decoded is None:
+        return None
+    if decoded[0] != src:
+        raise ValueError("This cursor is no longer valid (search index unavailable). Repeat the search without cursor.")
+    if len(decoded[1]) != arity:
+        raise ValueError("This cursor is no longer valid (sort key mismatch). Repeat the request without cursor.")
+    return decoded
+
+
+def _query_page(
+    table: str,
+    where: str,
+    args: list,
+    order: list[tuple[str, str]],
+    limit: Optional[int],
+    cursor: Optional[str],
+    fields: Optional[list[str]],
+) -> dict:
+    """
+    키셋 페이지네이션 공통 헬퍼.
+    - LIMIT limit+1로 다음 페이지 존재 여부를 판단 (OFFSET 없이 정렬 키로 이어서 조회)
+    - fields가 있으면 해당 컬럼(+정렬 키)만 SELECT
+    - 비버퍼(TimedSSDictCursor) 커서로 읽어 드라이버가 결과 전체를 미리 버퍼링하지 않도록 함
+    """
+    limit = _clamp_limit(limit)
+    fields = _check_fields(fields)
+    decoded = _check_cursor(_decode_cursor(cursor), "sql", len(order))
+
+    order_cols = [c for c, _ in order]
+    select_cols = list(dict.fromkeys(order_cols + fields)) if fields else None
+    tail = f"FROM {table} WHERE {where}"
+    args = list(args)
+    if decoded is not None:
+        clause, keyset_args = _keyset_clause(order, decoded[1])
+        tail += f" AND {clause}"
+        args.extend(keyset_args)
+    tail += " ORDER BY " + ", ".join(f"`{c}` {d}" for c, d in order) + " LIMIT %s"
+    args.append(limit + 1)
+
+    def from_db():
+        columns = ", ".join(f"`{c}`" for c in select_cols) if select_cols else "*"
+        with _get_conn() as conn:
+            with conn.cursor(TimedSSDictCursor) as cur:
+                cur.execute(f"SELECT {columns} {tail}", args)
+                return cur.fetchall()
+
+    try:
+        rows, snapshot = _with_snapshot(table, lambda snap: snap.select(table, select_cols, tail, args), from_db)
+    except pymysql.MySQLError as e:
+        if e.args and e.args[0] == 1054:
+            raise ValueError(f"Unknown field in fields: {fields}")
+        raise
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor("sql", [rows[-1][c] for c in order_cols]) if has_more else None
+    page = _page(rows, has_more, next_cursor, fields)
+    if snapshot is not None:
+        page["snapshot"] = snapshot
+    return page
+
+# ---- 식단 날짜/카테고리 정규화 컬럼 ----
+# DATE(`date`) / LOWER(category) 처럼 컬럼을 함수로 감싸면 인덱스를 못 타고 풀스캔이 된다.
+# `--migrate-meals`로 정규화 컬럼(meal_date, category_norm)과 복합 인덱스를 추가하면
+# 동등/범위 조건으로 조회하고, 컬럼이 없으면 기존(legacy) 조건으로 자동 폴백한다.
+# - auto: 컬럼 존재 + EXPLAIN 점검으로 결정, 컬럼이 사라지면 legacy로 폴백
+# - normalized: 점검 없이 정규화 컬럼만 사용, 컬럼이 없으면 폴백하지 않고 오류 (readyz도 실패)
+# - legacy: 항상 기존 조건
+MEAL_QUERY_MODE = os.getenv("MEAL_QUERY_MODE", "auto").strip().lower()  # auto | normalized | legacy
+MEAL_DATE_INDEX = "idx_smu_meals_date_category"
+
+# 시작 시 EXPLAIN 점검 결과 (점검 전에는 legacy로 동작, MEAL_QUERY_MODE=normalized면 처음부터 normalized)
+_MEAL_QUERY_STATE = {
+    "mode": "normalized" if MEAL_QUERY_MODE == "normalized" else "legacy",
+    "index": None, "checked_at": None, "reason": "not checked yet",
+}
+
+# `date` 컬럼이 문자열일 때 허용하는 형식 (인자 바인딩이 없는 DDL에서는 % 이스케이프 불필요)
+_MEAL_STR_DATE_EXPR = (
+    "COALESCE(STR_TO_DATE(`date`, '%Y-%m-%d'), "
+    "STR_TO_DATE(`date`, '%Y.%m.%d'), "
+    "STR_TO_DATE(`date`, '%Y/%m/%d'))"
+)
+_MEAL_CATEGORY_EXPR = "LOWER(TRIM(category))"
+
+
+def _meal_columns(cur) -> dict[str, str]:
+    cur.execute(
+        """
+        SELECT COLUMN_NAME, DATA_TYPE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'smu_meals'
+        """
+    )
+    return {r["COLUMN_NAME"].lower(): r["DATA_TYPE"].lower() for r in cur.fetchall()}
+
+
+def _detect_meal_query_mode() -> dict:
+    """
+    정규화 컬럼 존재 여부 확인 + EXPLAIN으로 인덱스 사용 여부를 점검해 조회 모드를 결정/보고한다.
+    - normalized: meal_date/category_norm 컬럼으로 동등 조건 조회 (index 항목에 실제 사용 인덱스)
+    - legacy: 기존 함수 기반 조건
+    """
+    state = {"mode": "legacy", "index": None, "checked_at": datetime.now(KST).isoformat(), "reason": ""}
+    if MEAL_QUERY_MODE == "legacy":
+        state["reason"] = "forced by MEAL_QUERY_MODE=legacy"
+    elif MEAL_QUERY_MODE == "normalized":
+        with _get_conn() as conn:
+            with conn.cursor() as cur:
+                cols = _meal_columns(cur)
+        missing = [c for c in ("meal_date", "category_norm") if c not in cols]
+        if missing:
+            raise RuntimeError(f"MEAL_QUERY_MODE=normalized but smu_meals is missing {missing} (run --migrate-meals)")
+        state.update(mode="normalized", reason="forced by MEAL_QUERY_MODE=normalized")
+    else:
+        with _get_conn() as conn:
+            with conn.cursor() as cur:
+                cols = _meal_columns(cur)
+                if "meal_date" not in cols or "category_norm" not in cols:
+                    state["reason"] = "normalized columns missing (run --migrate-meals)"
+                else:
+                    cur.execute(
+                        "EXPLAIN SELECT * FROM smu_meals WHERE meal_date = %s AND category_norm = %s",
+                        (datetime.now(KST).date().isoformat(), "lunch"),
+                    )
+                    plan = cur.fetchall()
+                    used = next((r.get("key") for r in plan if r.get("key")), None)
+                    state["mode"] = "normalized"
+                    state["index"] = used
+                    state["reason"] = (
+                        f"EXPLAIN uses index {used}" if used
+                        else "normalized columns present but EXPLAIN shows no index (full scan)"
+                    )
+    _MEAL_QUERY_STATE.update(state)
+    logger.info("meal query mode: %s (%s)", state["mode"], state["reason"])
+    return state
+
+
+def _migrate_meal_columns() -> dict:
+    """
+    smu_meals에 정규화 컬럼(meal_date DATE, category_norm VARCHAR)과 복합 인덱스를 추가한다.
+    1) STORED generated column 시도 (기존 행은 ALTER 시 자동 backfill, 새 행도 자동 계산)
+    2) 서버가 generated column 식을 거부하면 일반 컬럼 + UPDATE backfill + INSERT/UPDATE 트리거로 대체
+    이미 적용되어 있으면 아무것도 하지 않는다.
+    """
+    steps = []
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cols = _meal_columns(cur)
+            if "date" not in cols:
+                raise RuntimeError("smu_meals.date column not found")
+            date_expr = (
+                "DATE(`date`)" if cols["date"] in ("date", "datetime", "timestamp") else _MEAL_STR_DATE_EXPR
+            )
+
+            if "meal_date" not in cols or "category_norm" not in cols:
+                try:
+                    cur.execute(
+                        f"""
+                        ALTER TABLE smu_meals
+                          ADD COLUMN meal_date DATE AS ({date_expr}) STORED,
+                          ADD COLUMN category_norm VARCHAR(32) AS ({_MEAL_CATEGORY_EXPR}) STORED
+                        """
+                    )
+                    steps.append("added generated columns meal_date, category_norm")
+                except pymysql.MySQLError as e:
+                    logger.warning("generated column rejected (%s); falling back to triggers", e)
+                    cur.execute(
+                        """
+                        ALTER TABLE smu_meals
+                          ADD COLUMN meal_date DATE NULL,
+                          ADD COLUMN category_norm VARCHAR(32) NULL
+                        """
+                    )
+                    cur.execute(f"UPDATE smu_meals SET meal_date = {date_expr}, category_norm = {_MEAL_CATEGORY_EXPR}")
+                    steps.append(f"added plain columns and backfilled {cur.rowcount} rows")
+                    for event in ("INSERT", "UPDATE"):
+                        cur.execute(f"DROP TRIGGER IF EXISTS trg_smu_meals_norm_{event.lower()}")
+                        cur.execute(
+                            f"""
+                            CREATE TRIGGER trg_smu_meals_norm_{event.lower()}
+                            BEFORE {event} ON smu_meals FOR EACH ROW
+                            SET NEW.meal_date = {date_expr.replace('`date`', 'NEW.`date`')},
+                                NEW.category_norm = {_MEAL_CATEGORY_EXPR.replace('category', 'NEW.category')}
+                            """
+                        )
+                    steps.append("created insert/update triggers")
+
+            cur.execute("SHOW INDEX FROM smu_meals WHERE Key_name = %s", (MEAL_DATE_INDEX,))
+            if not cur.fetchall():
+                cur.execute(f"CREATE INDEX {MEAL_DATE_INDEX} ON smu_meals (meal_date, category_norm)")
+                steps.append(f"created index {MEAL_DATE_INDEX}")
+
+    state = _detect_meal_query_mode()
+    return {"ok": True, "steps": steps or ["already migrated"], "mode": state}
+
+
+def _is_unknown_column(e: Exception) -> bool:
+    return isinstance(e, pymysql.MySQLError) and e.args and e.args[0] == 1054
+
+
 def _query_meals_by_date_category(date_iso: str, category: str) -> list[dict]:
+    """(날짜, 카테고리) 식단 조회 — 스냅샷 모드면 로컬 스냅샷, 아니면 DB (인자는 _meal_cache_key로 정규화된 값)"""
+    rows, _ = _with_snapshot(
+        "smu_meals",
+        lambda snap: snap.select(
+            "smu_meals", None,
+            "FROM smu_meals WHERE `__meal_date` = %s AND `__category` = %s ORDER BY `date` ASC",
+            _meal_cache_key(date_iso, category),
+        ),
+        lambda: _query_meals_by_date_category_db(date_iso, category),
+    )
+    return rows
+
+
+def _query_meals_by_date_category_db(date_iso: str, category: str) -> list[dict]:
     """
     내부 헬퍼: YYYY-MM-DD(iso) 날짜와 카테고리(breakfast/lunch/dinner)로 smu_meals 조회
-    - date 컬럼이 DATE/DATETIME이거나 문자열(텍스트)인 경우 모두 대응
+    - 정규화 컬럼이 있으면 (meal_date, category_norm) 인덱스로 동등 조회
+    - 없으면 date 컬럼이 DATE/DATETIME이거나 문자열(텍스트)인 경우 모두 대응하는 기존 조건 사용
     """
-    conn = pymysql.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-        database=DB_NAME, port=DB_PORT, cursorclass=DictCursor, charset="utf8mb4"
-    )
-    try:
+    if _MEAL_QUERY_STATE["mode"] == "normalized":
+        try:
+            with _get_conn() as conn:
+                with conn.cursor() as cur:
+                    sql = """
+                        SELECT *
+                        FROM smu_meals
+                        WHERE meal_date = %s AND category_norm = %s
+                        ORDER BY `date` ASC
+                    """
+                    cur.execute(sql, _meal_cache_key(date_iso, category))
+                    return cur.fetchall()
+        except pymysql.MySQLError as e:
+            if not _is_unknown_column(e) or MEAL_QUERY_MODE == "normalized":
+                raise
+            # 컬럼이 사라졌다면(롤백된 마이그레이션 등) legacy로 전환
+            _MEAL_QUERY_STATE.update(mode="legacy", index=None, reason=f"fallback: {e}")
+            logger.warning("meal query fell back to legacy predicate: %s", e)
+
+    with _get_conn() as conn:
         with conn.cursor() as cur:
             # DATE 타입이면 DATE(`date`) = %s 로 맞음
             # 문자열일 가능성도 있어 COALESCE(STR_TO_DATE(...)) 로 보조
-            sql = """
+            # 카테고리는 정규화 컬럼/캐시 키와 같은 규칙(LOWER(TRIM()))으로 비교
+            sql = f"""
                 SELECT *
                 FROM smu_meals
-                WHERE LOWER(category) = LOWER(%s)
+                WHERE {_MEAL_CATEGORY_EXPR} = %s
                   AND (
                         DATE(`date`) = %s
                      OR COALESCE(
@@ -44,57 +1221,1310 @@ def _query_meals_by_date_category(date_iso: str, category: str) -> list[dict]:
                   )
                 ORDER BY `date` ASC
             """
+            date_iso, category = _meal_cache_key(date_iso, category)
             cur.execute(sql, (category, date_iso, date_iso))
             rows = cur.fetchall()
             return rows
-    finally:
-        conn.close()
 
-# FastMCP 서버 (HTTP/STDIO 겸용)
-mcp = FastMCP(name="smus")
+# ---- 동시 실행 제한 / 부하 차단 ----
+# 전역 동시 실행 상한(MAX_INFLIGHT_CALLS)을 넘는 호출은 줄 세우지 않고 즉시 'overloaded' 오류로 돌려보내고,
+# 툴별 상한(TOOL_CONCURRENCY)은 세마포어로 제한하되 TOOL_QUEUE_TIMEOUT 넘게 기다리면 같은 오류로 거절한다.
+# 예) TOOL_CONCURRENCY="query_smu_notices_by_keyword=8,query_smu_exam=8"
+MAX_INFLIGHT_CALLS = int(os.getenv("MAX_INFLIGHT_CALLS", "200"))          # 0이면 제한 없음
+TOOL_CONCURRENCY_DEFAULT = int(os.getenv("TOOL_CONCURRENCY_DEFAULT", "0"))  # 툴별 기본 상한(0이면 제한 없음)
+TOOL_QUEUE_TIMEOUT = float(os.getenv("TOOL_QUEUE_TIMEOUT", "2"))            # 툴 세마포어 대기 한도(초)
+OVERLOAD_RETRY_AFTER = float(os.getenv("OVERLOAD_RETRY_AFTER", "2"))        # 거절 응답의 재시도 권장 시간(초)
+
+
+def _parse_tool_limits(spec: str) -> dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            limits[name.strip()] = int(value)
+        except ValueError:
+            logger.warning("ignoring invalid TOOL_CONCURRENCY entry: %r", item)
+    return limits
+
+
+TOOL_CONCURRENCY = _parse_tool_limits(os.getenv("TOOL_CONCURRENCY", ""))
+
+_TOOL_REJECTED = METRICS.counter(
+    "smus_tool_rejected_total", "Tool calls rejected as overloaded (reason=inflight_cap|tool_limit)."
+)
+
+
+def _overloaded_result(tool: str, reason: str) -> CallToolResult:
+    """빠른 거절 응답: isError + 구조화된 {error, reason, retry_after}"""
+    _TOOL_REJECTED.inc(tool=tool, reason=reason)
+    payload = {
+        "error": "overloaded",
+        "reason": reason,
+        "tool": tool,
+        "retry_after": OVERLOAD_RETRY_AFTER,
+        "message": f"Server is busy ({reason}); retry after {OVERLOAD_RETRY_AFTER:g}s.",
+    }
+    return CallToolResult(
+        content=[TextContent(type="text", text=json.dumps(payload, ensure_ascii=False))],
+        structuredContent=payload,
+        isError=True,
+    )
+
+
+# FastMCP 서버 (HTTP/STDIO 겸용)
+class _InstrumentedFastMCP(FastMCP):
+    """
+    모든 툴 호출을 계측하고 동시 실행 수를 제한하는 FastMCP.
+    저수준 서버가 호출하는 call_tool을 가로채 결과 변환(직렬화)까지 직접 수행하므로
+    serialize 단계와 응답 바이트도 함께 잴 수 있다. 응답 형식은 기본 FastMCP와 동일.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inflight = 0
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, name: str) -> Optional[asyncio.Semaphore]:
+        limit = TOOL_CONCURRENCY.get(name, TOOL_CONCURRENCY_DEFAULT)
+        if limit <= 0:
+            return None
+        sem = self._semaphores.get(name)
+        if sem is None:
+            sem = self._semaphores[name] = asyncio.Semaphore(limit)
+        return sem
+
+    async def call_tool(self, name: str, arguments: dict):
+        label = name if self._tool_manager.get_tool(name) is not None else "unknown"
+        if MAX_INFLIGHT_CALLS > 0 and self.inflight >= MAX_INFLIGHT_CALLS:
+            return _overloaded_result(label, "inflight_cap")
+        self.inflight += 1
+        try:
+            sem = self._semaphore(name)
+            if sem is None:
+                return await self._call_tool_measured(name, arguments)
+            try:
+                await asyncio.wait_for(sem.acquire(), TOOL_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                return _overloaded_result(label, "tool_limit")
+            try:
+                return await self._call_tool_measured(name, arguments)
+            finally:
+                sem.release()
+        finally:
+            self.inflight -= 1
+
+    async def _call_tool_measured(self, name: str, arguments: dict):
+        tool = self._tool_manager.get_tool(name)
+        stats = _CallStats(name if tool is not None else "unknown")
+        token = _CALL_STATS.set(stats)
+        labels = {"tool": stats.tool}
+        if METRICS_SESSION_LABELS:
+            labels["session"] = self._session_label()
+        if METRICS_USER_LABELS:
+            labels["user_id"] = str((arguments or {}).get("user_id") or "-")
+        started = time.perf_counter()
+        status = "error"
+        try:
+            context = self.get_context()
+            result = await self._tool_manager.call_tool(name, arguments, context=context, convert_result=False)
+            t0 = time.perf_counter()
+            if stats.format != "rows" and not isinstance(result, CallToolResult):
+                result = _encode_result(tool, result, stats.meta)
+            else:
+                result = tool.fn_metadata.convert_result(result)
+            if stats.meta and not isinstance(result, CallToolResult):
+                content, structured = result if isinstance(result, tuple) else (result, None)
+                result = CallToolResult(content=list(content), structuredContent=structured, _meta=dict(stats.meta))
+            stats.phases["serialize"] = time.perf_counter() - t0
+            status = "ok"
+            return result
+        finally:
+            _CALL_STATS.reset(token)
+            _TOOL_CALLS.inc(status=status, **labels)
+            _TOOL_LATENCY.observe(time.perf_counter() - started, **labels)
+            for phase, seconds in stats.phases.items():
+                _TOOL_PHASE.observe(seconds, phase=phase, **labels)
+            _TOOL_ROWS.observe(stats.rows, **labels)
+            if status == "ok":
+                _TOOL_BYTES.observe(_content_bytes(result), format=stats.format, **labels)
+
+    def _session_label(self) -> str:
+        try:
+            request = self._mcp_server.request_context.request
+            return (request.headers.get("mcp-session-id") if request is not None else None) or "-"
+        except LookupError:
+            return "-"
+
+
+def _encode_result(tool, result, meta: dict) -> CallToolResult:
+    """
+    columnar/compact 응답: 들여쓰기 없는 JSON 한 덩어리로 바로 인코딩한다.
+    (FastMCP 기본 변환은 리스트 항목마다 들여쓴 텍스트 블록을 만든다)
+    """
+    text = pydantic_core.to_json(result, fallback=str).decode()
+    structured = None
+    if tool.fn_metadata.output_schema is not None:
+        value = pydantic_core.to_jsonable_python(result, fallback=str)
+        structured = {"result": value} if tool.fn_metadata.wrap_output else value
+    return CallToolResult(
+        content=[TextContent(type="text", text=text)], structuredContent=structured, _meta=dict(meta) if meta else None
+    )
+
+
+def _content_bytes(result) -> int:
+    """convert_result 결과(content 목록 또는 (content, structured) 튜플)의 텍스트 바이트 수"""
+    content = result[0] if isinstance(result, tuple) else getattr(result, "content", result)
+    return sum(len(c.text.encode("utf-8")) for c in content if getattr(c, "type", None) == "text")
+
+
+mcp = _InstrumentedFastMCP(name="smus")
+
+
+KST = ZoneInfo("Asia/Seoul")
+
+def _get_conn():
+    """프로세스 전역 풀에서 커넥션을 빌려오는 컨텍스트 매니저 (with 블록 종료 시 반납).
+    _read_on_replica 안에서 호출되면 선택된 레플리카의 풀을 사용한다."""
+    replica = _CONN_TARGET.get()
+    return (replica.pool if replica is not None else _POOL).connection()
+
+def _coerce_to_kst(dt_str: str) -> datetime:
+    """
+    문자열을 KST datetime으로 엄격 변환.
+    허용 예: '2025-10-21', '2025-10-21 13:30', '2025-10-21T13:30:00'
+    (날짜만 오면 00:00:00으로 보정)
+    """
+    s = dt_str.strip()
+    # ISO-like
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+        # tz 없는 경우 KST 부여, tz 있는 경우 KST로 변환
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=KST)
+        return dt.astimezone(KST)
+    except Exception:
+        pass
+
+    # 'YYYY-MM-DD HH:MM'
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            dt = datetime.strptime(s, fmt)
+            if fmt == "%Y-%m-%d":
+                dt = dt.replace(hour=0, minute=0, second=0)
+            return dt.replace(tzinfo=KST)
+        except Exception:
+            continue
+
+    raise ValueError(f"Invalid datetime format: {dt_str}. Use 'YYYY-MM-DD' or ISO-like strings.")
+
+
+# ---- 날짜 표현 → KST 구간 [start, end) ----
+_MONTH_NAMES = {
+    name: i
+    for i, names in enumerate(
+        [
+            ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+            ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+            ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+_RELATIVE_DAYS = {
+    "오늘": 0, "today": 0, "내일": 1, "tomorrow": 1, "모레": 2,
+    "어제": -1, "yesterday": -1, "그제": -2, "그저께": -2,
+}
+_RELATIVE_WEEKS = {"이번주": 0, "금주": 0, "thisweek": 0, "다음주": 1, "nextweek": 1, "지난주": -1, "저번주": -1, "lastweek": -1}
+_RELATIVE_MONTHS = {"이번달": 0, "thismonth": 0, "다음달": 1, "nextmonth": 1, "지난달": -1, "저번달": -1, "lastmonth": -1}
+
+
+# 연도만 단독으로 쓴 표현("2025", "2025년")을 연도로 인정하는 범위(현재 연도 ±N년)
+BARE_YEAR_WINDOW = int(os.getenv("BARE_YEAR_WINDOW", "30"))
+
+
+def _day_start(y: int, m: int, d: int) -> datetime:
+    return datetime(y, m, d, tzinfo=KST)
+
+
+def _month_range(y: int, m: int) -> tuple[datetime, datetime]:
+    start = _day_start(y, m, 1)
+    end = _day_start(y + 1, 1, 1) if m == 12 else _day_start(y, m + 1, 1)
+    return start, end
+
+
+def _parse_date_expression(expr: str, now: Optional[datetime] = None) -> tuple[datetime, datetime]:
+    """
+    날짜 표현을 KST 반열린 구간 [start, end)로 변환.
+    허용 예: '2025-10-21', '2025.10.21', '10-21', '10/21', '10월 21일', '2025년 10월 21일',
+            '10월', '2025년 10월', '2025-10', 'October', 'Oct 21', '2025',
+            '오늘/내일/어제', '이번 주/다음 주/지난 주', '이번 달/다음 달/지난 달'
+    연도가 없으면 올해(KST)로 본다.
+    """
+    now = (now or datetime.now(KST)).astimezone(KST)
+    today = _day_start(now.year, now.month, now.day)
+    raw = expr.strip()
+    key = _WS_RE.sub("", raw).lower()
+    if not key:
+        raise ValueError("Empty date expression.")
+
+    if key in _RELATIVE_DAYS:
+        start = today + timedelta(days=_RELATIVE_DAYS[key])
+        return start, start + timedelta(days=1)
+    if key in _RELATIVE_WEEKS:
+        start = today - timedelta(days=today.weekday()) + timedelta(weeks=_RELATIVE_WEEKS[key])
+        return start, start + timedelta(days=7)
+    if key in _RELATIVE_MONTHS:
+        offset = now.year * 12 + (now.month - 1) + _RELATIVE_MONTHS[key]
+        return _month_range(offset // 12, offset % 12 + 1)
+
+    # 'YYYY-MM-DD' / ISO-like (시간 포함이면 해당 날짜 하루)
+    try:
+        dt = _coerce_to_kst(raw)
+        start = _day_start(dt.year, dt.month, dt.day)
+        return start, start + timedelta(days=1)
+    except ValueError:
+        pass
+
+    m = re.fullmatch(r"(?:(\d{4})[-./년])?(\d{1,2})[-./월](\d{1,2})일?\.?", key)
+    if m:
+        y = int(m.group(1)) if m.group(1) else now.year
+        start = _day_start(y, int(m.group(2)), int(m.group(3)))
+        return start, start + timedelta(days=1)
+
+    m = re.fullmatch(r"(?:(\d{4})[-./년])?(\d{1,2})월?", key)
+    if m and (m.group(1) or key.endswith("월")):
+        y = int(m.group(1)) if m.group(1) else now.year
+        return _month_range(y, int(m.group(2)))
+
+    m = re.fullmatch(r"(\d{4})년?", key)
+    # 연도만 있는 표현은 현재 기준 ±BARE_YEAR_WINDOW년만 연도로 본다 ('1021' 같은 숫자는 LIKE 폴백)
+    if m and abs(int(m.group(1)) - now.year) <= BARE_YEAR_WINDOW:
+        y = int(m.group(1))
+        return _day_start(y, 1, 1), _day_start(y + 1, 1, 1)
+
+    # 영문 월 이름: 'October', 'Oct 21', '21 Oct', 'October 21, 2025'
+    m = re.fullmatch(r"([a-z]+)\.?(\d{1,2})?(?:,?(\d{4}))?", key) or re.fullmatch(r"(\d{1,2})([a-z]+)\.?(?:,?(\d{4}))?", key)
+    if m:
+        groups = m.groups()
+        name, day = (groups[0], groups[1]) if not groups[0].isdigit() else (groups[1], groups[0])
+        if name in _MONTH_NAMES:
+            y = int(groups[2]) if groups[2] else now.year
+            month = _MONTH_NAMES[name]
+            if day:
+                start = _day_start(y, month, int(day))
+                return start, start + timedelta(days=1)
+            return _month_range(y, month)
+
+    raise ValueError(
+        f"Unrecognized date expression: {expr}. "
+        "Use e.g. '2025-10-21', '10-21', '10월 21일', '10월', '이번 주', 'October'."
+    )
+
+
+# ---- 결과 캐시 ----
+_MISS = object()
+
+
+class TTLCache:
+    """
+    스레드 안전한 TTL + LRU 캐시.
+    - 항목마다 만료 시각을 가지며, 만료된 항목은 조회 시 제거
+    - maxsize를 넘으면 가장 오래 사용되지 않은 항목부터 제거
+    - 조회 결과가 없으면 _MISS 반환 (None/빈 리스트도 유효한 캐시 값이므로)
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return _MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None) -> None:
+        """key가 없으면 전체 비움"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+# ---- 식단 캐시 / 주간 프리페치 ----
+# 점심시간(11~13시 KST)에 같은 (날짜, 카테고리) 조회가 몰리므로 프로세스 내 캐시로 DB 접근을 생략
+MEAL_CACHE_ENABLED = _env_flag("MEAL_CACHE_ENABLED", True)
+MEAL_CACHE_TTL = float(os.getenv("MEAL_CACHE_TTL", "300"))   # 초
+MEAL_CACHE_SIZE = int(os.getenv("MEAL_CACHE_SIZE", "256"))    # (날짜, 카테고리) 항목 수
+MEAL_PREFETCH = _env_flag("MEAL_PREFETCH", False)             # 시작 시 + KST 자정마다 이번 주 식단 일괄 적재
+MEAL_CATEGORIES = ("breakfast", "lunch", "dinner")
+
+_MEAL_CACHE = TTLCache(MEAL_CACHE_SIZE, MEAL_CACHE_TTL)
+
+
+def _normalize_meal_date(value) -> Optional[str]:
+    """DATE/DATETIME/문자열('2025-08-27', '2025.08.27', '2025/08/27') 값을 'YYYY-MM-DD'로 정규화"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is None:
+        return None
+    s = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%Y.%m.%d", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return s
+
+
+def _meal_cache_key(date_iso: str, category: str) -> tuple[str, str]:
+    return (_normalize_meal_date(date_iso) or "", (category or "").strip().lower())
+
+
+def _seconds_until_kst_midnight(now: Optional[datetime] = None) -> float:
+    now = now or datetime.now(KST)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1.0, (tomorrow - now).total_seconds())
+
+
+def _query_meals_by_date_range(start_iso: str, end_iso: str) -> list[dict]:
+    """start_iso ~ end_iso(포함) 구간의 식단을 한 번의 쿼리로 조회"""
+    if _MEAL_QUERY_STATE["mode"] == "normalized":
+        try:
+            with _get_conn() as conn:
+                with conn.cursor() as cur:
+                    sql = """
+                        SELECT *
+                        FROM smu_meals
+                        WHERE meal_date >= %s AND meal_date <= %s
+                        ORDER BY `date` ASC
+                    """
+                    cur.execute(sql, (start_iso, end_iso))
+                    return cur.fetchall()
+        except pymysql.MySQLError as e:
+            if not _is_unknown_column(e) or MEAL_QUERY_MODE == "normalized":
+                raise
+            _MEAL_QUERY_STATE.update(mode="legacy", index=None, reason=f"fallback: {e}")
+            logger.warning("meal query fell back to legacy predicate: %s", e)
+
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            sql = """
+                SELECT *
+                FROM smu_meals
+                WHERE DATE(`date`) BETWEEN %s AND %s
+                   OR COALESCE(
+                          STR_TO_DATE(`date`, '%%Y-%%m-%%d'),
+                          STR_TO_DATE(`date`, '%%Y.%%m.%%d'),
+                          STR_TO_DATE(`date`, '%%Y/%%m/%%d')
+                      ) BETWEEN %s AND %s
+                ORDER BY `date` ASC
+            """
+            cur.execute(sql, (start_iso, end_iso, start_iso, end_iso))
+            return cur.fetchall()
+
+
+def _read_meals_by_date_range(start_iso: str, end_iso: str) -> tuple[list[dict], Optional[dict]]:
+    """구간 식단 조회 — (rows, 스냅샷 정보 또는 None)"""
+    return _with_snapshot(
+        "smu_meals",
+        lambda snap: snap.select(
+            "smu_meals", None,
+            "FROM smu_meals WHERE `__meal_date` >= %s AND `__meal_date` <= %s ORDER BY `date` ASC",
+            [start_iso, end_iso],
+        ),
+        lambda: _query_meals_by_date_range(start_iso, end_iso),
+    )
+
+
+def _prefetch_meal_week() -> int:
+    """
+    이번 주(월~일, KST) 식단 전체를 한 번에 읽어 캐시에 채운다.
+    식단이 없는 (날짜, 카테고리)도 빈 리스트로 채워 캐시 히트가 되도록 한다.
+    프리페치 항목은 다음 KST 자정(다음 프리페치 시점)까지 유지.
+    """
+    today = datetime.now(KST).date()
+    monday = today - timedelta(days=today.weekday())
+    days = [(monday + timedelta(days=i)).isoformat() for i in range(7)]
+    rows, _ = _read_meals_by_date_range(days[0], days[-1])
+
+    grid: dict[tuple[str, str], list[dict]] = {(d, c): [] for d in days for c in MEAL_CATEGORIES}
+    for row in rows:
+        key = _meal_cache_key(_normalize_meal_date(row.get("date")) or "", row.get("category") or "")
+        grid.setdefault(key, []).append(row)
+
+    ttl = _seconds_until_kst_midnight()
+    for key, value in grid.items():
+        _MEAL_CACHE.set(key, value, ttl=ttl)
+    logger.info("meal prefetch: %d rows for %s ~ %s", len(rows), days[0], days[-1])
+    return len(rows)
+
+
+def _meal_prefetch_loop() -> None:
+    loaded = False
+    while True:
+        try:
+            _read_on_replica(_prefetch_meal_week)
+            _READINESS.mark("meal_cache")
+            loaded = True
+        except Exception as e:
+            _READINESS.fail("meal_cache", e)
+            logger.warning("meal prefetch failed: %s", e)
+            if not loaded:
+                # 첫 적재 전이면 자정까지 기다리지 않고 곧 다시 시도
+                time.sleep(30)
+                continue
+        time.sleep(_seconds_until_kst_midnight() + 1)
+
+
+# ---- 키워드 검색 인덱스 (문자 n-gram 역색인) ----
+# LIKE '%kw%'는 인덱스를 못 타므로 공지/식단/시험 텍스트를 메모리 역색인으로 검색한다.
+# - 한글 음절 단위 unigram + bigram, 공백 제거 정규화로 띄어쓰기 무시 ('점심메뉴' == '점심 메뉴')
+# - 시작 시 전체 적재 후 id/created_at 기준 증분 갱신, 갱신이 밀리면(stale) SQL로 폴백
+SEARCH_INDEX_ENABLED = _env_flag("SEARCH_INDEX_ENABLED", True)
+SEARCH_INDEX_REFRESH = float(os.getenv("SEARCH_INDEX_REFRESH", "60"))            # 증분 갱신 주기(초)
+SEARCH_INDEX_MAX_STALENESS = float(os.getenv("SEARCH_INDEX_MAX_STALENESS", "300"))  # 이보다 오래되면 SQL 폴백(초)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize_search_text(text) -> str:
+    """NFKC + 소문자 + 모든 공백 제거 (띄어쓰기 무시 매칭용)"""
+    if text is None:
+        return ""
+    return _WS_RE.sub("", unicodedata.normalize("NFKC", str(text))).lower()
+
+
+class NgramIndex:
+    """
+    테이블 하나에 대한 문자 n-gram 역색인.
+    postings[(field, gram)] = {id, ...} 이고, 후보를 gram 교집합으로 좁힌 뒤
+    정규화 텍스트에 대한 부분 문자열 검사로 확정한다 (LIKE '%kw%'와 같은 의미, 공백만 무시).
+    """
+
+    def __init__(self, table: str, fields: tuple[str, ...]):
+        self.table = table
+        self.fields = fields
+        self._lock = threading.RLock()
+        self._docs: dict = {}
+        self._norm: dict = {}
+        self._postings: dict = defaultdict(set)
+        self.max_id = 0
+        self.max_created_at = None
+        self.refreshed_at: Optional[float] = None  # monotonic
+        self.loaded = False
+
+    @staticmethod
+    def _grams(text: str) -> set[str]:
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    @staticmethod
+    def _query_grams(text: str) -> set[str]:
+        # 질의는 bigram만으로 충분 (한 글자 질의는 unigram)
+        if len(text) <= 1:
+            return {text} if text else set()
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+
+    def _remove(self, doc_id) -> None:
+        norm = self._norm.pop(doc_id, None)
+        self._docs.pop(doc_id, None)
+        if not norm:
+            return
+        for field, text in norm.items():
+            for g in self._grams(text):
+                ids = self._postings.get((field, g))
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[(field, g)]
+
+    def _add(self, row: dict) -> None:
+        doc_id = row["id"]
+        if doc_id in self._docs:
+            self._remove(doc_id)
+        norm = {}
+        for field in self.fields:
+            if row.get(field) is None:
+                continue
+            text = _normalize_search_text(row[field])
+            norm[field] = text
+            for g in self._grams(text):
+                self._postings[(field, g)].add(doc_id)
+        self._docs[doc_id] = row
+        self._norm[doc_id] = norm
+        if isinstance(doc_id, int) and doc_id > self.max_id:
+            self.max_id = doc_id
+        created = row.get("created_at")
+        if created is not None and (self.max_created_at is None or created > self.max_created_at):
+            self.max_created_at = created
+
+    def add_rows(self, rows: list[dict]) -> None:
+        with self._lock:
+            for row in rows:
+                self._add(row)
+            self.refreshed_at = time.monotonic()
+            self.loaded = True
+
+    def replace_all(self, rows: Iterable[dict]) -> int:
+        """새 색인을 락 밖에서 만든 뒤 한 번에 교체 (검색이 빈 색인을 보지 않도록). 색인된 행 수를 반환"""
+        fresh = NgramIndex(self.table, self.fields)
+        fresh.add_rows(rows)
+        with self._lock:
+            self._docs, self._norm, self._postings = fresh._docs, fresh._norm, fresh._postings
+            self.max_id, self.max_created_at = fresh.max_id, fresh.max_created_at
+            self.refreshed_at = time.monotonic()
+            self.loaded = True
+        return len(fresh._docs)
+
+    def columns(self) -> Optional[set]:
+        """색인된 행의 컬럼 (빈 색인이면 None) — 결과가 비어도 fields를 검증할 수 있도록"""
+        with self._lock:
+            row = next(iter(self._docs.values()), None)
+        return None if row is None else set(row)
+
+    def is_fresh(self, max_staleness: float = SEARCH_INDEX_MAX_STALENESS) -> bool:
+        return self.loaded and self.refreshed_at is not None and (time.monotonic() - self.refreshed_at) <= max_staleness
+
+    def _match(self, field: str, query: str) -> dict:
+        """field에서 query(정규화)를 포함하는 문서 id -> 점수"""
+        q = _normalize_search_text(query)
+        if not q:
+            # LIKE '%%'와 동일: 값이 있는 모든 문서
+            return {doc_id: 0.0 for doc_id, norm in self._norm.items() if field in norm}
+        candidates = None
+        for g in sorted(self._query_grams(q), key=lambda g: len(self._postings.get((field, g), ()))):
+            ids = self._postings.get((field, g))
+            if not ids:
+                return {}
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return {}
+        scores = {}
+        for doc_id in candidates:
+            text = self._norm[doc_id].get(field, "")
+            count = text.count(q)
+            if not count:
+                continue
+            # 등장 횟수 + 접두 일치 가산 + 텍스트 대비 질의 비중(짧고 정확한 제목 우선)
+            scores[doc_id] = count + (0.5 if text.startswith(q) else 0.0) + len(q) / len(text)
+        return scores
+
+    def search(
+        self, criteria: list[tuple[str, str]], top_k: int, after: Optional[list] = None
+    ) -> list[tuple[float, dict]]:
+        """
+        criteria의 (field, query) 조건을 모두 만족(AND)하는 문서를 점수순(동점이면 최신 id 우선)으로
+        최대 top_k개 (점수, 행) 쌍으로 반환. after=[점수, id]이면 그 다음 순위부터 (키셋 페이지네이션)
+        """
+        with self._lock:
+            combined = None
+            for field, query in criteria:
+                scores = self._match(field, query)
+                if combined is None:
+                    combined = scores
+                else:
+                    combined = {k: v + scores[k] for k, v in combined.items() if k in scores}
+                if not combined:
+                    return []
+            items = combined.items()
+            if after is not None:
+                after_key = (-float(after[0]), -_id_sort_key(after[1]))
+                items = [kv for kv in items if (-kv[1], -_id_sort_key(kv[0])) > after_key]
+            ranked = heapq.nsmallest(top_k, items, key=lambda kv: (-kv[1], -_id_sort_key(kv[0])))
+            return [(score, self._docs[doc_id]) for doc_id, score in ranked]
+
+    def load(self) -> int:
+        # 비버퍼 커서에서 한 행씩 읽으며 바로 색인 — 테이블 전체를 행 목록으로 따로 들고 있지 않는다
+        with _get_conn() as conn:
+            with conn.cursor(BackgroundSSDictCursor) as cur:
+                cur.execute(f"SELECT * FROM {self.table}")
+                return self.replace_all(cur)
+
+    def refresh(self) -> int:
+        """
+        증분 갱신: id가 커졌거나 created_at이 갱신된 행만 다시 색인.
+        행 수가 색인보다 줄었거나, 증분 적용 후에도 행 수가 맞지 않으면(삭제 + 추가가 같은 주기에 발생) 전체 재적재.
+        """
+        if not self.loaded:
+            return self.load()
+        with _get_conn() as conn:
+            with conn.cursor(BackgroundDictCursor) as cur:
+                cur.execute(f"SELECT COUNT(*) AS cnt FROM {self.table}")
+                count = cur.fetchone()["cnt"]
+                if count < len(self._docs):
+                    cur.execute(f"SELECT * FROM {self.table}")
+                    self.replace_all(cur.fetchall())
+                    return count
+                if self.max_created_at is not None:
+                    cur.execute(
+                        f"SELECT * FROM {self.table} WHERE id > %s OR created_at > %s",
+                        (self.max_id, self.max_created_at),
+                    )
+                else:
+                    cur.execute(f"SELECT * FROM {self.table} WHERE id > %s", (self.max_id,))
+                rows = cur.fetchall()
+                self.add_rows(rows)
+                with self._lock:
+                    indexed = len(self._docs)
+                if indexed != count:
+                    cur.execute(f"SELECT * FROM {self.table}")
+                    self.replace_all(cur.fetchall())
+                    return count
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "table": self.table,
+                "docs": len(self._docs),
+                "grams": len(self._postings),
+                "max_id": self.max_id,
+                "loaded": self.loaded,
+                "age_s": (time.monotonic() - self.refreshed_at) if self.refreshed_at else None,
+                "fresh": self.is_fresh(),
+            }
+
+
+def _id_sort_key(doc_id) -> float:
+    return doc_id if isinstance(doc_id, (int, float)) else 0
+
+
+_SEARCH_INDEXES = {
+    "notices": NgramIndex("smu_notices", ("title",)),
+    "meals": NgramIndex("smu_meals", ("meal",)),
+    "exam": NgramIndex("smu_exam", ("subject_name", "professor")),
+}
+
+
+def _search_index_page(
+    name: str,
+    criteria: list[tuple[str, str]],
+    limit: Optional[int],
+    cursor: Optional[str],
+    fields: Optional[list[str]],
+) -> Optional[dict]:
+    """
+    인덱스로 답할 수 있으면 페이지 응답, 비활성/stale 이거나 SQL 커서로 이어보는 중이면 None
+    (호출 측에서 SQL 폴백)
+    """
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    index = _SEARCH_INDEXES[name]
+    if not index.is_fresh():
+        return None
+    decoded = _decode_cursor(cursor)
+    if decoded is not None and decoded[0] != "idx":
+        return None
+    decoded = _check_cursor(decoded, "idx", 2)
+    limit = _clamp_limit(limit)
+    fields = _check_fields(fields)
+    hits = index.search(criteria, limit + 1, after=decoded[1] if decoded else None)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    next_cursor = _encode_cursor("idx", [hits[-1][0], hits[-1][1]["id"]]) if has_more else None
+    return _page([row for _, row in hits], has_more, next_cursor, fields, index.columns())
+
+
+def _search_index_loop() -> None:
+    while True:
+        failed = 0
+        for name, index in _SEARCH_INDEXES.items():
+            try:
+                _read_on_replica(index.refresh)
+            except Exception as e:
+                failed += 1
+                _READINESS.fail("search_index", f"{name}: {e}")
+                logger.warning("search index refresh failed (%s): %s", name, e)
+        if not failed:
+            _READINESS.mark("search_index")
+        time.sleep(SEARCH_INDEX_REFRESH)
+
+
+# ---- 로컬 읽기 스냅샷 (SQLite) ----
+# smu_meals / smu_notices / smu_exam은 하루에 몇 번 바뀌지 않으므로 주기적으로 로컬 SQLite 파일에 복사해 두고
+# 읽기 전용 툴은 여기서 답한다. 갱신은 증분(id/created_at 기준 upsert)이며 SQLite 트랜잭션 하나로 적용되어
+# 읽는 쪽은 항상 갱신 전 또는 후의 완전한 상태만 본다(WAL). DB에 접속할 수 없으면 오래된 스냅샷이라도 사용.
+# smu_schedule은 쓰기가 있으므로 스냅샷 대상이 아니다.
+SNAPSHOT_ENABLED = _env_flag("SNAPSHOT_ENABLED", False)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "smus_snapshot.sqlite3")
+SNAPSHOT_REFRESH = float(os.getenv("SNAPSHOT_REFRESH", "300"))               # 증분 갱신 주기(초)
+SNAPSHOT_MAX_STALENESS = float(os.getenv("SNAPSHOT_MAX_STALENESS", "900"))   # 이보다 오래되면 DB 우선(초)
+
+_SNAPSHOT_READS = METRICS.counter(
+    "smus_snapshot_reads_total", "Reads served from the local snapshot (reason=fresh|db_unavailable)."
+)
+
+# 컬럼 선언 타입 -> 읽을 때 원래 파이썬 타입으로 복원 (응답 JSON이 MySQL에서 읽은 것과 같도록)
+sqlite3.register_converter("SMUS_DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("SMUS_DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("SMUS_DECIMAL", lambda b: Decimal(b.decode()))
+
+_SNAPSHOT_TYPES = {
+    FIELD_TYPE.DATETIME: "SMUS_DATETIME",
+    FIELD_TYPE.TIMESTAMP: "SMUS_DATETIME",
+    FIELD_TYPE.DATE: "SMUS_DATE",
+    FIELD_TYPE.NEWDATE: "SMUS_DATE",
+    FIELD_TYPE.DECIMAL: "SMUS_DECIMAL",
+    FIELD_TYPE.NEWDECIMAL: "SMUS_DECIMAL",
+    FIELD_TYPE.TINY: "INTEGER",
+    FIELD_TYPE.SHORT: "INTEGER",
+    FIELD_TYPE.INT24: "INTEGER",
+    FIELD_TYPE.LONG: "INTEGER",
+    FIELD_TYPE.LONGLONG: "INTEGER",
+    FIELD_TYPE.YEAR: "INTEGER",
+    FIELD_TYPE.FLOAT: "REAL",
+    FIELD_TYPE.DOUBLE: "REAL",
+}
+
+# 스냅샷 전용 정규화 컬럼 (응답에는 포함하지 않음)
+_SNAPSHOT_DERIVED = {
+    "smu_meals": {
+        "__meal_date": lambda row: _normalize_meal_date(row.get("date")),
+        "__category": lambda row: (row.get("category") or "").strip().lower(),
+    },
+}
+_SNAPSHOT_INDEXES = {
+    "smu_meals": [("__meal_date", "__category")],
+    "smu_exam": [("subject_name", "id")],
+}
+
+
+def _snapshot_value(v):
+    if isinstance(v, datetime):
+        return v.isoformat(" ")
+    if isinstance(v, (date, Decimal, timedelta)):
+        return str(v)
+    return v
+
+
+class SqliteSnapshot:
+    """
+    MySQL 테이블의 로컬 SQLite 사본.
+    - _snapshot_meta에 테이블별 컬럼/행 수/최대 id·created_at/갱신 시각을 저장 (재시작 후에도 사용 가능)
+    - refresh(): 새로 추가·수정된 행만 upsert, 행 수가 어긋나면(삭제) 같은 트랜잭션에서 전체 재적재
+    - select(): 원래 컬럼만 dict로 반환
+    """
+
+    def __init__(self, path: str, tables: tuple[str, ...]):
+        self.path = path
+        self.tables = tables
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._meta: dict[str, dict] = {}
+        self._meta_lock = threading.Lock()
+        # 변경 감지가 본 워터마크를 스냅샷이 아직 따라잡지 못한 테이블 → 그 워터마크 (그동안은 DB에서 읽음)
+        self._held: dict[str, dict] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        # 스레드마다 읽기 커넥션 하나 (WAL이므로 매 쿼리가 마지막으로 커밋된 상태를 본다)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def open(self) -> None:
+        """기존 스냅샷 파일이 있으면 메타데이터를 읽어 바로 사용할 수 있게 한다."""
+        conn = self._reader()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS _snapshot_meta (
+                table_name TEXT PRIMARY KEY, columns TEXT, row_count INTEGER,
+                max_id INTEGER, max_created_at TEXT, refreshed_at REAL
+            )
+            """
+        )
+        with self._meta_lock:
+            for name, columns, row_count, max_id, max_created_at, refreshed_at in conn.execute(
+                "SELECT table_name, columns, row_count, max_id, max_created_at, refreshed_at FROM _snapshot_meta"
+            ):
+                self._meta[name] = {
+                    "columns": json.loads(columns), "row_count": row_count, "max_id": max_id,
+                    "max_created_at": max_created_at, "refreshed_at": refreshed_at,
+                }
+
+    def has(self, table: str) -> bool:
+        with self._meta_lock:
+            return table in self._meta
+
+    def info(self, table: str) -> Optional[dict]:
+        """응답에 싣는 스냅샷 시점/경과 시간"""
+        with self._meta_lock:
+            meta = self._meta.get(table)
+        if meta is None:
+            return None
+        age = max(0.0, time.time() - meta["refreshed_at"])
+        return {
+            "table": table,
+            "as_of": datetime.fromtimestamp(meta["refreshed_at"], KST).isoformat(),
+            "age_s": round(age, 1),
+            "stale": age > SNAPSHOT_MAX_STALENESS,
+        }
+
+    def is_fresh(self, table: str) -> bool:
+        with self._meta_lock:
+            if table in self._held:
+                return False
+        info = self.info(table)
+        return info is not None and not info["stale"]
+
+    def matches(self, table: str, mark: dict) -> bool:
+        """스냅샷 메타데이터(max_id, row_count)가 변경 감지 워터마크와 같은지"""
+        with self._meta_lock:
+            meta = self._meta.get(table)
+        return meta is not None and meta["max_id"] == mark["max_id"] and meta["row_count"] == mark["cnt"]
 
+    def hold(self, table: str, mark: dict) -> None:
+        """스냅샷이 mark를 반영할 때까지 이 테이블 읽기를 DB로 돌린다"""
+        with self._meta_lock:
+            self._held[table] = mark
 
-KST = ZoneInfo("Asia/Seoul")
+    def release_caught_up(self) -> list[str]:
+        """워터마크를 따라잡은 테이블의 hold를 푼다"""
+        with self._meta_lock:
+            held = dict(self._held)
+        released = [t for t, mark in held.items() if self.matches(t, mark)]
+        with self._meta_lock:
+            for t in released:
+                if self._held.get(t) is held[t]:
+                    del self._held[t]
+        return released
 
-def _get_conn():
-    host = os.getenv("DB_HOST")
-    user = os.getenv("DB_USER")
-    password = os.getenv("DB_PASSWORD")
-    database = os.getenv("DB_NAME")
-    port = int(os.getenv("DB_PORT", "3306"))
-    if not all([host, user, password, database]):
-        raise RuntimeError("DB env vars not set: DB_HOST/DB_USER/DB_PASSWORD/DB_NAME")
-    return pymysql.connect(host=host, user=user, password=password,
-                           database=database, port=port, autocommit=True)
+    def select(self, table: str, columns: Optional[list[str]], tail: str, args) -> list[dict]:
+        """
+        SELECT <columns> {tail} 실행. tail은 MySQL 쿼리와 같은 'FROM ... WHERE ... ORDER BY ...' 문자열(%s 자리표시자).
+        columns가 없으면 스냅샷에 저장된 원래 컬럼 전체.
+        """
+        with self._meta_lock:
+            stored = [c for c, _ in self._meta[table]["columns"]]
+        cols = columns or stored
+        # SQLite는 없는 "컬럼"을 문자열 리터럴로 해석하므로 직접 확인
+        if any(c not in stored for c in cols):
+            raise ValueError(f"Unknown field in fields: {columns}")
+        sql = "SELECT " + ", ".join(f'"{c}"' for c in cols) + " " + tail.replace("%s", "?")
+        cur = self._reader().execute(sql, list(args))
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
 
-def _coerce_to_kst(dt_str: str) -> datetime:
+    def refresh(self) -> dict:
+        results = {}
+        for table in self.tables:
+            results[table] = self.refresh_table(table)
+        return results
+
+    @staticmethod
+    def _columns(description) -> list[list[str]]:
+        return [[d[0], _SNAPSHOT_TYPES.get(d[1], "TEXT")] for d in description]
+
+    def refresh_table(self, table: str) -> dict:
+        """
+        증분 갱신: id가 커졌거나 created_at이 갱신된 행만 upsert.
+        적용 후 행 수가 MySQL과 다르거나(삭제) 컬럼 구성이 바뀌었으면 전체 재적재.
+        """
+        with self._meta_lock:
+            meta = self._meta.get(table)
+        delta = None
+        with _get_conn() as conn:
+            with conn.cursor(BackgroundDictCursor) as cur:
+                cur.execute(f"SELECT COUNT(*) AS cnt FROM {table}")
+                count = cur.fetchone()["cnt"]
+                if meta is not None and meta["max_id"] is not None:
+                    if meta["max_created_at"] is not None:
+                        cur.execute(
+                            f"SELECT * FROM {table} WHERE id > %s OR created_at > %s",
+                            (meta["max_id"], meta["max_created_at"]),
+                        )
+                    else:
+                        cur.execute(f"SELECT * FROM {table} WHERE id > %s", (meta["max_id"],))
+                    rows = cur.fetchall()
+                    if self._columns(cur.description) == meta["columns"]:
+                        delta = rows
+        if delta is not None and self._write(table, meta["columns"], delta, full=False, expected_count=count):
+            return {"mode": "incremental", "rows": len(delta), "row_count": count}
+
+        # 비버퍼 커서의 행을 그대로 SQLite executemany로 흘려 보낸다 (MySQL 행 전체를 목록으로 들고 있지 않음)
+        with _get_conn() as conn:
+            with conn.cursor(BackgroundSSDictCursor) as cur:
+                cur.execute(f"SELECT * FROM {table}")
+                columns = self._columns(cur.description)
+                self._write(table, columns, cur, full=True)
+        with self._meta_lock:
+            row_count = self._meta[table]["row_count"]
+        return {"mode": "full", "rows": row_count, "row_count": row_count}
+
+    def _write(
+        self, table: str, columns: list[list[str]], rows: Iterable[dict], full: bool, expected_count: Optional[int] = None
+    ) -> bool:
+        """한 트랜잭션으로 적용 (rows는 executemany가 읽는 대로 소비). expected_count와 행 수가 다르면 롤백하고 False."""
+        names = [c for c, _ in columns]
+        derived = _SNAPSHOT_DERIVED.get(table, {})
+        all_names = names + list(derived)
+        insert_sql = (
+            f'INSERT OR REPLACE INTO "{table}" (' + ", ".join(f'"{c}"' for c in all_names) + ") VALUES ("
+            + ", ".join("?" for _ in all_names) + ")"
+        )
+        params = (
+            [_snapshot_value(row.get(c)) for c in names] + [fn(row) for fn in derived.values()] for row in rows
+        )
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                if full:
+                    defs = [
+                        f'"{c}" {"INTEGER PRIMARY KEY" if c == "id" else t}' for c, t in columns
+                    ] + [f'"{c}" TEXT' for c in derived]
+                    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                    conn.execute(f'CREATE TABLE "{table}" (' + ", ".join(defs) + ")")
+                    for i, cols in enumerate(_SNAPSHOT_INDEXES.get(table, [])):
+                        if all(c in all_names for c in cols):
+                            conn.execute(
+                                f'CREATE INDEX "idx_{table}_{i}" ON "{table}" (' + ", ".join(f'"{c}"' for c in cols) + ")"
+                            )
+                conn.executemany(insert_sql, params)
+                row_count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                if expected_count is not None and row_count != expected_count:
+                    conn.execute("ROLLBACK")
+                    return False
+                max_id = conn.execute(f'SELECT MAX("id") FROM "{table}"').fetchone()[0] if "id" in names else None
+                max_created_at = (
+                    conn.execute(f'SELECT MAX("created_at") FROM "{table}"').fetchone()[0]
+                    if "created_at" in names else None
+                )
+                refreshed_at = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO _snapshot_meta VALUES (?, ?, ?, ?, ?, ?)",
+                    (table, json.dumps(columns), row_count, max_id, max_created_at, refreshed_at),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+        with self._meta_lock:
+            self._meta[table] = {
+                "columns": columns, "row_count": row_count, "max_id": max_id,
+                "max_created_at": max_created_at, "refreshed_at": refreshed_at,
+            }
+        return True
+
+    def stats(self) -> dict:
+        return {table: self.info(table) for table in self.tables}
+
+
+_SNAPSHOT = SqliteSnapshot(SNAPSHOT_PATH, ("smu_meals", "smu_notices", "smu_exam")) if SNAPSHOT_ENABLED else None
+
+
+def _with_snapshot(table: str, from_snapshot, from_db) -> tuple[list[dict], Optional[dict]]:
     """
-    문자열을 KST datetime으로 엄격 변환.
-    허용 예: '2025-10-21', '2025-10-21 13:30', '2025-10-21T13:30:00'
-    (날짜만 오면 00:00:00으로 보정)
+    (rows, 스냅샷 정보 또는 None) 반환.
+    - 스냅샷이 신선하면 스냅샷에서 읽음
+    - 오래됐으면 DB 우선, DB에 접속할 수 없으면 오래된 스냅샷이라도 사용 (stale=True로 표시)
     """
-    s = dt_str.strip()
-    # ISO-like
+    if _SNAPSHOT is None or not _SNAPSHOT.has(table):
+        return from_db(), None
+    if _SNAPSHOT.is_fresh(table):
+        reason = "fresh"
+    else:
+        try:
+            return from_db(), None
+        except Exception as e:
+            if not _is_connection_error(e):
+                raise
+            logger.warning("DB unavailable, serving %s from snapshot: %s", table, e)
+            reason = "db_unavailable"
+    rows = from_snapshot(_SNAPSHOT)
+    info = _SNAPSHOT.info(table)
+    _SNAPSHOT_READS.inc(table=table, reason=reason)
+    _note_response_meta("smus/snapshot", info)
+    return rows, info
+
+
+def _snapshot_loop() -> None:
     try:
-        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
-        # tz 없는 경우 KST 부여, tz 있는 경우 KST로 변환
-        if dt.tzinfo is None:
-            return dt.replace(tzinfo=KST)
-        return dt.astimezone(KST)
-    except Exception:
-        pass
+        _SNAPSHOT.open()
+    except Exception as e:
+        _READINESS.fail("snapshot", e)
+        logger.warning("snapshot disabled, cannot open %s: %s", SNAPSHOT_PATH, e)
+        return
+    if all(_SNAPSHOT.has(t) for t in _SNAPSHOT.tables):
+        # 이전 실행의 스냅샷 파일이 있으면 DB 갱신을 기다리지 않고 바로 사용 가능
+        _READINESS.mark("snapshot", "loaded from file")
+    while True:
+        if WORKER_INDEX != 0:
+            # 멀티 워커: 파일 갱신은 0번 워커 몫, 여기서는 갱신된 메타데이터만 다시 읽는다
+            time.sleep(SNAPSHOT_REFRESH)
+            try:
+                _SNAPSHOT.open()
+                if all(_SNAPSHOT.has(t) for t in _SNAPSHOT.tables):
+                    _READINESS.mark("snapshot", "loaded from file")
+            except Exception as e:
+                logger.warning("snapshot reload failed: %s", e)
+            continue
+        try:
+            results = _read_on_replica(_SNAPSHOT.refresh)
+            _READINESS.mark("snapshot")
+            logger.info("snapshot refreshed: %s", results)
+        except Exception as e:
+            _READINESS.fail("snapshot", e)
+            logger.warning("snapshot refresh failed (serving last snapshot): %s", e)
+        time.sleep(SNAPSHOT_REFRESH)
 
-    # 'YYYY-MM-DD HH:MM'
-    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+
+# ---- 기동 / 준비 상태 ----
+# 컨테이너 기동 직후 첫 요청이 접속/캐시 적재 비용을 떠안지 않도록 백그라운드에서 미리 데우고,
+# 완료 여부를 /readyz로 알린다 (/healthz는 프로세스가 살아 있으면 항상 200).
+def _validate_db_config() -> list[str]:
+    """DB 설정 점검 (기동 시 한 번). 문제가 있어도 프로세스는 띄우고 readyz에서 보고한다."""
+    problems = [f"{env} is not set" for env, key in
+                (("DB_HOST", "host"), ("DB_USER", "user"), ("DB_PASSWORD", "password"), ("DB_NAME", "database"))
+                if not DB_CONFIG.get(key)]
+    if _DB_PORT_RAW is not None and not _DB_PORT_RAW.strip().isdigit():
+        problems.append(f"DB_PORT is not a number: {_DB_PORT_RAW!r} (using {DB_PORT})")
+    return problems
+
+
+class Readiness:
+    """기동 시 데워야 하는 구성 요소(db_pool, search_index, snapshot, digest, meal_cache)의 준비 상태"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: dict[str, dict] = {}
+        self.config_problems: list[str] = []
+        self.ready_after: Optional[float] = None  # import 시작 → 전부 준비될 때까지(초)
+
+    def expect(self, name: str) -> None:
+        with self._lock:
+            self._components.setdefault(name, {"ready": False, "after_s": None, "detail": None})
+
+    def mark(self, name: str, detail: Optional[str] = None) -> None:
+        with self._lock:
+            comp = self._components.setdefault(name, {"ready": False, "after_s": None, "detail": None})
+            if comp["ready"]:
+                return
+            comp.update(ready=True, after_s=round(time.perf_counter() - _IMPORT_STARTED, 3), detail=detail)
+            if self.ready_after is None and all(c["ready"] for c in self._components.values()):
+                self.ready_after = comp["after_s"]
+                logger.info("ready %.2fs after import", self.ready_after)
+
+    def fail(self, name: str, error) -> None:
+        with self._lock:
+            comp = self._components.get(name)
+            if comp is not None and not comp["ready"]:
+                comp["detail"] = str(error)
+
+    def ready(self) -> bool:
+        with self._lock:
+            return bool(self._components) and all(c["ready"] for c in self._components.values())
+
+    def status(self) -> dict:
+        with self._lock:
+            components = {k: dict(v) for k, v in self._components.items()}
+        return {
+            "ready": bool(components) and all(c["ready"] for c in components.values()),
+            "components": components,
+            "config_problems": list(self.config_problems),
+            "import_s": round(_IMPORT_SECONDS, 3) if _IMPORT_SECONDS is not None else None,
+            "ready_after_s": self.ready_after,
+        }
+
+
+_READINESS = Readiness()
+
+
+def _warm_pool() -> None:
+    """풀에 커넥션을 미리 열어 둔다. DB가 아직 준비되지 않았으면 성공할 때까지 재시도 (그동안 readyz는 503)"""
+    delay = 1.0
+    while True:
         try:
-            dt = datetime.strptime(s, fmt)
-            if fmt == "%Y-%m-%d":
-                dt = dt.replace(hour=0, minute=0, second=0)
-            return dt.replace(tzinfo=KST)
-        except Exception:
-            continue
+            warmed = _POOL.warm(max(1, DB_POOL_WARM))
+            _READINESS.mark("db_pool", f"{warmed} connection(s)")
+            logger.info("db pool warmed: %d connection(s)", warmed)
+            return
+        except Exception as e:
+            _READINESS.fail("db_pool", e)
+            logger.warning("db pool warm-up failed, retrying in %.0fs: %s", delay, e)
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+def _startup_checks() -> None:
+    _warm_pool()
+    try:
+        _detect_meal_query_mode()
+        if MEAL_QUERY_MODE == "normalized":
+            _READINESS.mark("meal_query_mode")
+    except Exception as e:
+        if MEAL_QUERY_MODE == "normalized":
+            # 강제한 모드를 쓸 수 없으면 legacy로 조용히 돌지 않고 readyz를 실패시킨다
+            _READINESS.fail("meal_query_mode", e)
+            logger.error("meal query mode check failed: %s", e)
+        else:
+            logger.warning("meal query mode check failed, staying on legacy: %s", e)
+    if MEAL_CACHE_ENABLED and MEAL_PREFETCH:
+        _meal_prefetch_loop()
+
+
+def _start_background_jobs() -> None:
+    """서버 시작 시 백그라운드 작업(daemon thread) 기동 — 풀 예열/시작 점검 후 (옵션) 식단 프리페치 루프"""
+    _READINESS.config_problems = _validate_db_config()
+    for problem in _READINESS.config_problems:
+        logger.warning("config: %s", problem)
+    _READINESS.expect("db_pool")
+    if MEAL_QUERY_MODE == "normalized":
+        _READINESS.expect("meal_query_mode")
+    if MEAL_CACHE_ENABLED and MEAL_PREFETCH:
+        _READINESS.expect("meal_cache")
+    if SEARCH_INDEX_ENABLED:
+        _READINESS.expect("search_index")
+    if _SNAPSHOT is not None:
+        _READINESS.expect("snapshot")
+    if DIGEST_ENABLED:
+        _READINESS.expect("digest")
+    threading.Thread(target=_startup_checks, name="smus-startup", daemon=True).start()
+    if SEARCH_INDEX_ENABLED:
+        threading.Thread(target=_search_index_loop, name="smus-search-index", daemon=True).start()
+    if _SNAPSHOT is not None:
+        threading.Thread(target=_snapshot_loop, name="smus-snapshot", daemon=True).start()
+    if DIGEST_ENABLED:
+        threading.Thread(target=_digest_loop, name="smus-digest", daemon=True).start()
+    if CHANGE_FEED_ENABLED:
+        threading.Thread(target=_change_feed_loop, name="smus-change-feed", daemon=True).start()
+    if _REPLICAS.replicas:
+        threading.Thread(target=_replica_health_loop, name="smus-replica-health", daemon=True).start()
+
+
+@METRICS.collector
+def _runtime_gauges() -> list:
+    pool = _POOL.stats()
+    meal = _MEAL_CACHE.stats()
+    gauges = [
+        ("smus_db_pool_connections", "DB pool connections by state.",
+         [({"state": k}, pool[k]) for k in ("opened", "idle", "in_use", "waiting")]),
+        ("smus_db_pool_events", "Cumulative DB pool events (checkouts, created, recycled, timeouts ...).",
+         [({"event": k}, pool[k]) for k in ("checkouts", "created", "recycled", "health_check_failures", "timeouts")]),
+        ("smus_db_pool_wait_seconds_total", "Total time spent waiting for a pooled connection.",
+         [({}, pool["wait_time_total_s"])]),
+        ("smus_meal_cache_entries", "Meal cache entries.", [({}, meal["size"])]),
+        ("smus_meal_cache_events", "Cumulative meal cache hits/misses/evictions.",
+         [({"event": k}, meal[k]) for k in ("hits", "misses", "evictions")]),
+    ]
+    gauges.append(("smus_tool_inflight", "Tool calls currently executing.", [({}, mcp.inflight)]))
+    ready = _READINESS.status()
+    gauges += [
+        ("smus_ready", "1 when every startup component (pool, caches, indexes) is warm.", [({}, int(ready["ready"]))]),
+        ("smus_ready_component", "Startup component readiness.",
+         [({"component": k}, int(c["ready"])) for k, c in ready["components"].items()]),
+        ("smus_startup_seconds", "Seconds from module import start to import end / to ready.",
+         [({"phase": "import"}, ready["import_s"] or 0.0)]
+         + ([({"phase": "ready"}, ready["ready_after_s"])] if ready["ready_after_s"] is not None else [])),
+    ]
+    sched = _SCHEDULE_CACHE.stats()
+    gauges += [
+        ("smus_schedule_cache_common_rows", "Common schedule rows held in memory.", [({}, sched["common_rows"])]),
+        ("smus_schedule_cache_users", "Users with cached personal schedules.", [({}, sched["users"]["size"])]),
+        ("smus_schedule_cache_events", "Cumulative personal schedule cache hits/misses/evictions.",
+         [({"event": k}, sched["users"][k]) for k in ("hits", "misses", "evictions")]),
+    ]
+    index_stats = {name: index.stats() for name, index in _SEARCH_INDEXES.items()}
+    gauges += [
+        ("smus_search_index_docs", "Documents in the in-memory search index.",
+         [({"index": n}, s["docs"]) for n, s in index_stats.items()]),
+        ("smus_search_index_age_seconds", "Seconds since the search index was last refreshed.",
+         [({"index": n}, s["age_s"]) for n, s in index_stats.items()]),
+    ]
+    if _REPLICAS.replicas:
+        replicas = _REPLICAS.stats()
+        gauges += [
+            ("smus_db_replica_up", "1 if the read replica passed its last health check.",
+             [({"host": r["host"]}, 1 if r["healthy"] else 0) for r in replicas]),
+            ("smus_db_replica_latency_seconds", "Health-check round trip (EWMA) per read replica.",
+             [({"host": r["host"]}, None if r["latency_ms"] is None else r["latency_ms"] / 1000) for r in replicas]),
+            ("smus_db_replica_pool_in_use", "Connections in use per read replica pool.",
+             [({"host": r["host"]}, r["pool"]["in_use"]) for r in replicas]),
+        ]
+    if _SNAPSHOT is not None:
+        snap_stats = {t: i for t, i in _SNAPSHOT.stats().items() if i is not None}
+        gauges.append(
+            ("smus_snapshot_age_seconds", "Seconds since each snapshot table was last refreshed.",
+             [({"table": t}, i["age_s"]) for t, i in snap_stats.items()])
+        )
+    return gauges
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request):
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-    raise ValueError(f"Invalid datetime format: {dt_str}. Use 'YYYY-MM-DD' or ISO-like strings.")
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz_endpoint(request):
+    """liveness — 이벤트 루프가 응답하면 200 (DB 상태와 무관)"""
+    from starlette.responses import JSONResponse
+
+    return JSONResponse({"status": "ok", "uptime_s": round(time.perf_counter() - _IMPORT_STARTED, 3)})
+
+
+@mcp.custom_route("/readyz", methods=["GET"])
+async def readyz_endpoint(request):
+    """readiness — 풀 예열과 캐시/인덱스 첫 적재가 끝났으면 200, 아니면 503 + 구성 요소별 상태"""
+    from starlette.responses import JSONResponse
+
+    status = _READINESS.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
 
 
@@ -113,104 +2543,182 @@ def now_kr() -> dict:
     }
 
 @mcp.tool()
-def query_smu_meals_by_date_category(date_iso: str, category: str = "lunch") -> dict:
+async def query_smu_meals_by_date_category(date_iso: str, category: str = "lunch", format: str = "rows") -> dict:
     """
     YYYY-MM-DD 날짜와 카테고리로 smu_meals를 조회한다.
     Args:
         date_iso: '2025-08-27' 같은 ISO 날짜 문자열
         category: 'breakfast' | 'lunch' | 'dinner'
+        format: 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약)
     Returns:
         dict: 레코드 리스트
     """
-    rows = _query_meals_by_date_category(date_iso, category)
-    return rows  # 이미 list[dict]
+    fmt = _check_format(format)
+    # 캐시/single-flight 키와 DB 조회 인자가 항상 같도록 정규화된 값으로 조회한다
+    key = _meal_cache_key(date_iso, category)
+    flight_key = ("query_smu_meals_by_date_category",) + key
+    if not MEAL_CACHE_ENABLED:
+        rows = await _run_db_shared(flight_key, _query_meals_by_date_category, *key)
+        return _respond(_shape_rows(rows, fmt), fmt)
+
+    # 캐시 히트면 DB(스레드 풀 포함)를 전혀 거치지 않는다
+    rows = _MEAL_CACHE.get(key)
+    if rows is _MISS:
+        rows = await _run_db_shared(flight_key, _query_meals_by_date_category, *key)
+        _MEAL_CACHE.set(key, rows)
+    return _respond(_shape_rows(rows, fmt), fmt)  # 이미 list[dict]
+
+def _query_meals_by_keyword(
+    keyword: str, limit: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[list[str]] = None
+) -> dict:
+    return _query_page(
+        "smu_meals", "meal LIKE %s", [f"%{keyword}%"], [("id", "ASC")], limit, cursor, fields
+    )
 
 # (기존) 키워드 검색 도구가 필요하면 이 버전처럼 안전하게 수정
 @mcp.tool()
-def query_smu_meals_by_keyword(keyword: str) -> dict:
+async def query_smu_meals_by_keyword(
+    keyword: str,
+    limit: int = PAGE_DEFAULT_ROWS,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+    format: str = "rows",
+) -> dict:
     """
     'meal' 텍스트 등에서 키워드 검색 (보조 용도)
+    - 띄어쓰기 무시, 관련도순 결과 (검색 인덱스 사용 시)
+    - limit: 페이지 크기 (서버 상한 PAGE_MAX_ROWS), cursor: 이전 응답의 next_cursor
+    - fields: 반환할 컬럼만 지정 (예: ["date", "category", "meal"])
+    - format: 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약)
+    - 반환: { rows, count, has_more, next_cursor }
     """
-    conn = pymysql.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-        database=DB_NAME, port=DB_PORT, cursorclass=DictCursor, charset="utf8mb4"
+    fmt = _check_format(format)
+    page = _search_index_page("meals", [("meal", keyword)], limit, cursor, fields)
+    if page is None:
+        page = await _run_db_shared(
+            _page_flight_key("query_smu_meals_by_keyword", keyword, limit=limit, cursor=cursor, fields=fields),
+            _query_meals_by_keyword, keyword, limit, cursor, fields,
+        )
+    return _respond(_shape_page(page, fmt), fmt)
+
+def _query_notices_by_keyword(
+    keyword: str, limit: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[list[str]] = None
+) -> dict:
+    # 쿼리 작성: 'title' 컬럼에서 키워드를 포함하는 행을 최신순으로 찾는 쿼리
+    return _query_page(
+        "smu_notices", "title LIKE %s", [f"%{keyword}%"], [("id", "DESC")], limit, cursor, fields
     )
-    try:
-        with conn.cursor() as cur:
-            sql = "SELECT * FROM smu_meals WHERE meal LIKE %s"
-            cur.execute(sql, (f"%{keyword}%",))
-            return cur.fetchall()
-    finally:
-        conn.close()
 
 @mcp.tool()
-def query_smu_notices_by_keyword(keyword: str) -> dict:
+async def query_smu_notices_by_keyword(
+    keyword: str,
+    limit: int = PAGE_DEFAULT_ROWS,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+    format: str = "rows",
+) -> dict:
     """
     'smu_notices' 테이블에서 'title' 컬럼에 특정 키워드를 포함하는 행을 조회하여 결과를 반환하는 도구.
     
     Args:
         keyword (str): 'title' 컬럼에서 찾을 키워드.
+        limit (int): 페이지 크기 (서버 상한 PAGE_MAX_ROWS).
+        cursor (str, optional): 이전 응답의 next_cursor (다음 페이지 조회).
+        fields (list[str], optional): 반환할 컬럼만 지정 (예: ["title", "url"]).
+        format (str): 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약).
         
-        dict: 키워드가 포함된 'title' 컬럼을 가진 행들 반환.
+    Returns:
+        dict: { rows, count, has_more, next_cursor }
+              (검색 인덱스 사용 시 띄어쓰기 무시, 관련도순 / 아니면 최신순)
     """
-
-    # MySQL 연결
-    conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            port=DB_PORT
+    fmt = _check_format(format)
+    page = _search_index_page("notices", [("title", keyword)], limit, cursor, fields)
+    if page is None:
+        page = await _run_db_shared(
+            _page_flight_key("query_smu_notices_by_keyword", keyword, limit=limit, cursor=cursor, fields=fields),
+            _query_notices_by_keyword, keyword, limit, cursor, fields,
         )
-    cursor = conn.cursor()
-
-        # 쿼리 작성: 'title' 컬럼에서 키워드를 포함하는 행을 찾는 쿼리
-    sql = f"SELECT * FROM smu_notices WHERE title LIKE %s"
-    cursor.execute(sql, (f"%{keyword}%",))
-        
-    return cursor.fetchall()
+    return _respond(_shape_page(page, fmt), fmt)
     
+def _query_exam(
+    keyword: str,
+    professor: str | None = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+) -> dict:
+    if professor:
+        where = """
+            subject_name IS NOT NULL
+            AND subject_name LIKE %s
+            AND professor IS NOT NULL
+            AND professor LIKE %s
+        """
+        args = [f"%{keyword}%", f"%{professor}%"]
+    else:
+        where = "subject_name IS NOT NULL AND subject_name LIKE %s"
+        args = [f"%{keyword}%"]
+    return _query_page(
+        "smu_exam", where, args, [("subject_name", "ASC"), ("id", "ASC")], limit, cursor, fields
+    )
+
 @mcp.tool()
-def query_smu_exam(keyword: str, professor: str | None = None) -> list[dict]:
+async def query_smu_exam(
+    keyword: str,
+    professor: str | None = None,
+    limit: int = PAGE_DEFAULT_ROWS,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+    format: str = "rows",
+) -> dict:
     """
     smu_exam 테이블에서 subject_name, professor 조건을 조합해 검색.
     - professor 인자가 주어지면 AND 조건으로 subject_name + professor 검색
     - professor가 없으면 subject_name만 검색
-    - 반환: list[dict]
+    - limit/cursor로 페이지 단위 조회, fields로 반환 컬럼 지정
+    - format: 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약)
+    - 반환: { rows, count, has_more, next_cursor } (검색 인덱스 사용 시 띄어쓰기 무시, 관련도순)
     """
-    conn = pymysql.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-        database=DB_NAME, port=DB_PORT,
-        cursorclass=DictCursor, charset="utf8mb4"
+    fmt = _check_format(format)
+    criteria = [("subject_name", keyword)]
+    if professor:
+        criteria.append(("professor", professor))
+    page = _search_index_page("exam", criteria, limit, cursor, fields)
+    if page is None:
+        page = await _run_db_shared(
+            _page_flight_key("query_smu_exam", keyword, professor or None, limit=limit, cursor=cursor, fields=fields),
+            _query_exam, keyword, professor, limit, cursor, fields,
+        )
+    return _respond(_shape_page(page, fmt), fmt)
+
+def _query_schedule_by_keyword(
+    keyword: str,
+    user_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+) -> dict:
+    if user_id:
+        # user_id가 있으면: common + 해당 user_id의 personal 일정
+        where = "content LIKE %s AND (type = 'common' OR (type = 'personal' AND user_id = %s))"
+        args = [f"%{keyword}%", user_id]
+    else:
+        # user_id가 없으면: common 일정만
+        where = "content LIKE %s AND type = 'common'"
+        args = [f"%{keyword}%"]
+    return _query_page(
+        "smu_schedule", where, args, [("start_date", "ASC"), ("id", "ASC")], limit, cursor, fields
     )
-    try:
-        with conn.cursor() as cur:
-            if professor:
-                sql = """
-                    SELECT *
-                    FROM smu_exam
-                    WHERE subject_name IS NOT NULL
-                      AND subject_name LIKE %s
-                      AND professor IS NOT NULL
-                      AND professor LIKE %s
-                    ORDER BY subject_name ASC
-                """
-                cur.execute(sql, (f"%{keyword}%", f"%{professor}%"))
-            else:
-                sql = """
-                    SELECT *
-                    FROM smu_exam
-                    WHERE subject_name IS NOT NULL
-                      AND subject_name LIKE %s
-                    ORDER BY subject_name ASC
-                """
-                cur.execute(sql, (f"%{keyword}%",))
-            return cur.fetchall()
-    finally:
-        conn.close()
-        
+
 @mcp.tool()
-def query_smu_schedule_by_keyword(keyword: str, user_id: Optional[str] = None) -> list[dict]:
+async def query_smu_schedule_by_keyword(
+    keyword: str,
+    user_id: Optional[str] = None,
+    limit: int = PAGE_DEFAULT_ROWS,
+    cursor: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+    format: str = "rows",
+) -> dict:
     """
     'smu_schedule' 테이블에서 'content' 컬럼에 특정 키워드를 포함하는 행을 조회하여 결과를 반환하는 도구.
     type에 따라 필터링: 'common'은 모든 사용자에게, 'personal'은 해당 user_id에게만 제공.
@@ -218,67 +2726,67 @@ def query_smu_schedule_by_keyword(keyword: str, user_id: Optional[str] = None) -
     Args:
         keyword (str): 'content' 컬럼에서 찾을 키워드.
         user_id (str, optional): student ID (학번). 제공되면 해당 사용자의 개인 일정도 포함.
+        limit (int): 페이지 크기 (서버 상한 PAGE_MAX_ROWS).
+        cursor (str, optional): 이전 응답의 next_cursor (다음 페이지 조회).
+        fields (list[str], optional): 반환할 컬럼만 지정 (예: ["start_date", "content"]).
+        format (str): 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약).
         
     Returns:
-        list[dict]: 키워드가 포함된 일정들 (type='common' + user_id가 일치하는 type='personal')
-    """
-    conn = pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        port=DB_PORT,
-        cursorclass=DictCursor,
-        charset="utf8mb4"
-    )
-    try:
-        with conn.cursor() as cur:
-            if user_id:
-                # user_id가 있으면: common + 해당 user_id의 personal 일정
-                sql = """
-                    SELECT * FROM smu_schedule 
-                    WHERE content LIKE %s 
-                    AND (type = 'common' OR (type = 'personal' AND user_id = %s))
-                    ORDER BY start_date ASC
-                """
-                cur.execute(sql, (f"%{keyword}%", user_id))
-            else:
-                # user_id가 없으면: common 일정만
-                sql = """
-                    SELECT * FROM smu_schedule 
-                    WHERE content LIKE %s AND type = 'common'
-                    ORDER BY start_date ASC
-                """
-                cur.execute(sql, (f"%{keyword}%",))
-            
-            return cur.fetchall()
-    finally:
-        conn.close()
+        dict: { rows, count, has_more, next_cursor }
+              rows = 키워드가 포함된 일정들 (type='common' + user_id가 일치하는 type='personal'), start_date순
+    """
+    fmt = _check_format(format)
+    if SCHEDULE_CACHE_ENABLED:
+        tiers = await _schedule_tiers(user_id)
+        page = _schedule_keyword_page_cached(tiers, keyword, limit, cursor, fields)
+    else:
+        page = await _run_db_shared(
+            _page_flight_key(
+                "query_smu_schedule_by_keyword", keyword, user_id or None, limit=limit, cursor=cursor, fields=fields
+            ),
+            _query_schedule_by_keyword, keyword, user_id, limit, cursor, fields, user_id=user_id,
+        )
+    return _respond(_shape_page(page, fmt), fmt)
 
-@mcp.tool()
-def query_smu_schedule_by_date(date_keyword: str, user_id: Optional[str] = None) -> list[dict]:
+
+SCHEDULE_MAX_SPAN_DAYS = int(os.getenv("SCHEDULE_MAX_SPAN_DAYS", "400"))  # 일정 하나의 최대 기간(일), 범위 스캔 하한용
+SCHEDULE_DATE_INDEX = "idx_smu_schedule_type_user_start"
+
+_SCHEDULE_COLUMNS = "id, start_date, end_date, content, type, user_id, created_at"
+
+
+def _query_schedule_by_date_range(start: datetime, end: datetime, user_id: Optional[str] = None) -> list[dict]:
     """
-    'smu_schedule' 테이블에서 날짜를 키워드로 찾아 해당하는 content를 반환하는 도구.
-    start_date 또는 end_date 컬럼에서 날짜를 검색하여 일치하는 스케줄의 content를 반환합니다.
-    type에 따라 필터링: 'common'은 모든 사용자에게, 'personal'은 해당 user_id에게만 제공.
-    
-    Args:
-        date_keyword (str): 검색할 날짜 키워드 (예: '2025-10-21', '10-21', '10월 21일' 등)
-        user_id (str, optional): student ID (학번). 제공되면 해당 사용자의 개인 일정도 포함.
-        
-    Returns:
-        list[dict]: 날짜와 일치하는 스케줄들 (type='common' + user_id가 일치하는 type='personal')
+    [start, end) 구간과 겹치는 일정 조회: start_date < end AND COALESCE(end_date, start_date) >= start
+    - 여러 날에 걸친 일정도 포함, end_date가 NULL인 일정은 start_date 하루짜리로 취급
+    - start_date 하한(start - SCHEDULE_MAX_SPAN_DAYS)을 두어 (type, user_id, start_date) 인덱스 범위 스캔이 되도록 함
+    - common / personal을 UNION ALL로 분리해 각 분기가 인덱스 동등 조건을 쓰도록 함
     """
-    conn = pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        port=DB_PORT,
-        cursorclass=DictCursor,
-        charset="utf8mb4"
-    )
-    try:
+    fmt = "%Y-%m-%d %H:%M:%S"
+    lo = (start - timedelta(days=SCHEDULE_MAX_SPAN_DAYS)).strftime(fmt)
+    range_args = [lo, end.strftime(fmt), start.strftime(fmt)]
+    range_sql = "start_date >= %s AND start_date < %s AND COALESCE(end_date, start_date) >= %s"
+
+    sql = f"SELECT {_SCHEDULE_COLUMNS} FROM smu_schedule WHERE type = 'common' AND {range_sql}"
+    args = list(range_args)
+    if user_id:
+        # user_id가 있으면: common + 해당 user_id의 personal 일정
+        sql += (
+            f" UNION ALL SELECT {_SCHEDULE_COLUMNS} FROM smu_schedule"
+            f" WHERE type = 'personal' AND user_id = %s AND {range_sql}"
+        )
+        args += [user_id] + range_args
+    sql += " ORDER BY start_date ASC, id ASC"
+
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, args)
+            return cur.fetchall()
+
+
+def _query_schedule_by_date_like(date_keyword: str, user_id: Optional[str] = None) -> list[dict]:
+    """날짜 표현을 해석하지 못했을 때의 (기존) 문자열 LIKE 매칭"""
+    with _get_conn() as conn:
         with conn.cursor() as cur:
             date_pattern = f"%{date_keyword}%"
             
@@ -310,8 +2818,259 @@ def query_smu_schedule_by_date(date_keyword: str, user_id: Optional[str] = None)
                 cur.execute(sql, (date_pattern, date_pattern, date_pattern, date_pattern))
             
             return cur.fetchall()
-    finally:
-        conn.close()
+
+
+def _migrate_schedule_index() -> dict:
+    """smu_schedule에 (type, user_id, start_date) 복합 인덱스 추가 (이미 있으면 생략)"""
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SHOW INDEX FROM smu_schedule WHERE Key_name = %s", (SCHEDULE_DATE_INDEX,))
+            if cur.fetchall():
+                return {"ok": True, "steps": ["already migrated"]}
+            cur.execute(f"CREATE INDEX {SCHEDULE_DATE_INDEX} ON smu_schedule (type, user_id, start_date)")
+            return {"ok": True, "steps": [f"created index {SCHEDULE_DATE_INDEX}"]}
+
+# ---- 일정 캐시 (공통 일정 공유 + 사용자별 개인 일정) ----
+# common 일정은 모든 사용자가 같은 목록을 다시 읽으므로 (start_date, id) 순으로 정렬된 사본 하나를 공유하고,
+# personal 일정은 user_id별 LRU에 둔다. 조회는 두 정렬 목록을 heapq.merge로 합쳐 메모리에서 답한다.
+# 이 서버를 통한 일정 추가/삭제는 commit 직후 그 사용자의 항목만 비우고(_on_schedule_write),
+# 외부에서 바뀌는 common 일정은 SCHEDULE_COMMON_TTL마다 다시 읽는다.
+SCHEDULE_CACHE_ENABLED = _env_flag("SCHEDULE_CACHE_ENABLED", True)
+SCHEDULE_COMMON_TTL = float(os.getenv("SCHEDULE_COMMON_TTL", "300"))   # 공통 일정 재적재 주기(초)
+SCHEDULE_USER_TTL = float(os.getenv("SCHEDULE_USER_TTL", "600"))       # 개인 일정 캐시 유효 시간(초)
+SCHEDULE_CACHE_USERS = int(os.getenv("SCHEDULE_CACHE_USERS", "1000"))  # 개인 일정을 캐시할 최대 사용자 수
+
+_SCHEDULE_FIELDS = [c.strip() for c in _SCHEDULE_COLUMNS.split(",")]
+
+
+def _schedule_dt(value) -> datetime:
+    """start_date/end_date 값을 비교용 naive(KST) datetime으로 (NULL은 가장 앞)"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if value:
+        try:
+            return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+        except ValueError:
+            pass
+    return datetime.min
+
+
+def _schedule_sort_key(row: dict) -> tuple:
+    return (_schedule_dt(row.get("start_date")), _id_sort_key(row.get("id")))
+
+
+def _like_matcher(keyword: str):
+    """MySQL `LIKE '%keyword%'`와 같은 매칭 함수 (%, _ 와일드카드와 \\ 이스케이프, 대소문자 무시)"""
+    parts, escaped = [], False
+    for ch in keyword:
+        if escaped:
+            parts.append(re.escape(ch))
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    pattern = re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+    return lambda text: text is not None and pattern.search(str(text)) is not None
+
+
+class ScheduleCache:
+    """
+    2단 일정 캐시.
+    - common: (start_date, id) 정렬 목록 하나 + 컬럼 목록, SCHEDULE_COMMON_TTL 후 만료
+    - personal: user_id -> 정렬 목록 (TTLCache, LRU)
+    적재 도중 invalidate_*가 일어나면 그 적재 결과는 저장하지 않는다 (세대 번호 비교).
+    """
+
+    def __init__(self, max_users: int, common_ttl: float, user_ttl: float):
+        self.common_ttl = common_ttl
+        self._lock = threading.Lock()
+        self._common: Optional[tuple[list[dict], list[str]]] = None
+        self._common_loaded_at = 0.0
+        self._common_gen = 0
+        self._users = TTLCache(max_users, user_ttl)
+        self._user_gen: dict[str, int] = {}
+        self._gen = 0
+
+    def get_common(self) -> Optional[tuple[list[dict], list[str]]]:
+        """(정렬된 common 행, 컬럼 목록) 또는 None"""
+        with self._lock:
+            if self._common is None or time.monotonic() - self._common_loaded_at > self.common_ttl:
+                return None
+            return self._common
+
+    def get_personal(self, user_id: str):
+        """정렬된 personal 행 또는 _MISS"""
+        return self._users.get(str(user_id))
+
+    def common_token(self) -> int:
+        with self._lock:
+            return self._common_gen
+
+    def user_token(self, user_id: str) -> int:
+        with self._lock:
+            return self._user_gen.get(str(user_id), 0)
+
+    def set_common(self, rows: list[dict], columns: list[str], token: int) -> None:
+        with self._lock:
+            if token == self._common_gen:
+                self._common, self._common_loaded_at = (rows, columns), time.monotonic()
+
+    def set_personal(self, user_id: str, rows: list[dict], token: int) -> None:
+        with self._lock:
+            if token != self._user_gen.get(str(user_id), 0):
+                return
+            self._users.set(str(user_id), rows)
+
+    def invalidate_user(self, user_id: Optional[str]) -> None:
+        if not user_id:
+            return
+        with self._lock:
+            self._gen += 1
+            if len(self._user_gen) > 10 * self._users.maxsize:
+                self._user_gen.clear()
+            self._user_gen[str(user_id)] = self._gen
+            self._users.invalidate(str(user_id))
+
+    def invalidate_common(self) -> None:
+        with self._lock:
+            self._common_gen += 1
+            self._common = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            common = None if self._common is None else len(self._common[0])
+            age = (time.monotonic() - self._common_loaded_at) if self._common is not None else None
+        return {"common_rows": common, "common_age_s": age, "users": self._users.stats()}
+
+
+_SCHEDULE_CACHE = ScheduleCache(SCHEDULE_CACHE_USERS, SCHEDULE_COMMON_TTL, SCHEDULE_USER_TTL)
+
+
+def _load_schedule_common() -> tuple[list[dict], list[str]]:
+    token = _SCHEDULE_CACHE.common_token()
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM smu_schedule WHERE type = 'common'")
+            rows = sorted(cur.fetchall(), key=_schedule_sort_key)
+            columns = [d[0] for d in cur.description]
+    _SCHEDULE_CACHE.set_common(rows, columns, token)
+    return rows, columns
+
+
+def _load_schedule_personal(user_id: str) -> list[dict]:
+    token = _SCHEDULE_CACHE.user_token(user_id)
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM smu_schedule WHERE type = 'personal' AND user_id = %s", (user_id,))
+            rows = sorted(cur.fetchall(), key=_schedule_sort_key)
+    _SCHEDULE_CACHE.set_personal(user_id, rows, token)
+    return rows
+
+
+async def _schedule_tiers(user_id: Optional[str]) -> tuple:
+    """(common 행, personal 행, 컬럼 목록) — 캐시에 없는 쪽만 DB에서 읽는다"""
+    common = _SCHEDULE_CACHE.get_common()
+    if common is None:
+        common = await _run_db_shared(("schedule_common",), _load_schedule_common)
+    personal = []
+    if user_id:
+        personal = _SCHEDULE_CACHE.get_personal(user_id)
+        if personal is _MISS:
+            personal = await _run_db_shared(
+                ("schedule_personal", str(user_id)), _load_schedule_personal, user_id, user_id=user_id
+            )
+    return common[0], personal, common[1]
+
+
+def _merged_schedule(tiers: tuple, predicate, after: Optional[tuple] = None):
+    """common + personal 정렬 목록을 병합하며 predicate를 만족하고 키셋 after 이후인 행을 순서대로 생성"""
+    common, personal, _ = tiers
+    for row in heapq.merge(common, personal, key=_schedule_sort_key):
+        if after is not None and _schedule_sort_key(row) <= after:
+            continue
+        if predicate(row):
+            yield row
+
+
+def _schedule_keyword_page_cached(
+    tiers: tuple, keyword: str, limit: Optional[int], cursor: Optional[str], fields: Optional[list[str]]
+) -> dict:
+    """_query_schedule_by_keyword와 같은 결과/커서를 메모리에서 계산"""
+    limit = _clamp_limit(limit)
+    fields = _check_fields(fields)
+    unknown = [f for f in fields or [] if f not in tiers[2]]
+    if unknown:
+        raise ValueError(f"Unknown field in fields: {fields}")
+    decoded = _check_cursor(_decode_cursor(cursor), "sql", 2)
+    after = None
+    if decoded is not None:
+        after = (_schedule_dt(decoded[1][0]), _id_sort_key(decoded[1][1]))
+    match = _like_matcher(keyword)
+    rows = list(itertools.islice(_merged_schedule(tiers, lambda r: match(r.get("content")), after), limit + 1))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor("sql", [rows[-1]["start_date"], rows[-1]["id"]]) if has_more else None
+    return _page(rows, has_more, next_cursor, fields)
+
+
+def _schedule_range_cached(tiers: tuple, start: datetime, end: datetime) -> list[dict]:
+    """_query_schedule_by_date_range와 같은 조건(기간 겹침 + start_date 하한)을 메모리에서 적용"""
+    lo = (start - timedelta(days=SCHEDULE_MAX_SPAN_DAYS)).replace(tzinfo=None)
+    start_n, end_n = start.replace(tzinfo=None), end.replace(tzinfo=None)
+
+    def overlaps(row: dict) -> bool:
+        s = _schedule_dt(row.get("start_date"))
+        e = _schedule_dt(row.get("end_date")) if row.get("end_date") is not None else s
+        return lo <= s < end_n and e >= start_n
+
+    return [{f: row.get(f) for f in _SCHEDULE_FIELDS} for row in _merged_schedule(tiers, overlaps)]
+
+
+@mcp.tool()
+async def query_smu_schedule_by_date(
+    date_keyword: str, user_id: Optional[str] = None, format: str = "rows"
+) -> list[dict] | dict:
+    """
+    'smu_schedule' 테이블에서 날짜를 키워드로 찾아 해당하는 content를 반환하는 도구.
+    날짜 표현을 KST 기간으로 해석해 그 기간과 겹치는(여러 날에 걸친 일정 포함) 스케줄을 반환합니다.
+    type에 따라 필터링: 'common'은 모든 사용자에게, 'personal'은 해당 user_id에게만 제공.
+    
+    Args:
+        date_keyword (str): 검색할 날짜 키워드 (예: '2025-10-21', '10-21', '10월 21일', '10월', '이번 주', 'October' 등)
+            날짜로 해석되지 않는 키워드(현재 ±BARE_YEAR_WINDOW년 밖의 4자리 숫자 포함)는 문자열 LIKE 검색으로 처리.
+        user_id (str, optional): student ID (학번). 제공되면 해당 사용자의 개인 일정도 포함.
+        format (str): 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약).
+        
+    Returns:
+        list[dict]: 날짜와 일치하는 스케줄들 (type='common' + user_id가 일치하는 type='personal')
+                    (format='columnar'이면 { columns, rows })
+
+    Note:
+        start_date 인덱스를 쓰기 위해 조회 기간 시작보다 SCHEDULE_MAX_SPAN_DAYS(기본 400일) 이상 앞서
+        시작한 일정은 기간과 겹치더라도 결과에서 제외됩니다. 더 긴 일정이 있으면 환경변수로 늘리세요.
+    """
+    fmt = _check_format(format)
+    # '오늘'과 '2025-10-21'처럼 표현만 다르고 같은 기간이면 하나의 조회로 병합
+    try:
+        start, end = _parse_date_expression(date_keyword)
+    except ValueError:
+        key = ("query_smu_schedule_by_date", "like", date_keyword, user_id or None)
+        rows = await _run_db_shared(key, _query_schedule_by_date_like, date_keyword, user_id, user_id=user_id)
+        return _respond(_shape_rows(rows, fmt), fmt)
+    if SCHEDULE_CACHE_ENABLED:
+        rows = _schedule_range_cached(await _schedule_tiers(user_id), start, end)
+    else:
+        key = ("query_smu_schedule_by_date", start.isoformat(), end.isoformat(), user_id or None)
+        rows = await _run_db_shared(key, _query_schedule_by_date_range, start, end, user_id, user_id=user_id)
+    return _respond(_shape_rows(rows, fmt), fmt)
+
 
 @mcp.tool()
 def query_special_keywords(keyword: str) -> dict:
@@ -332,10 +3091,100 @@ def query_special_keywords(keyword: str) -> dict:
         "김정찬": "해적왕이 될 사람이다."
     }
 
-    return responses[keyword]
+    return responses[keyword]
+
+def _apply_user_write(user_id: Optional[str]) -> None:
+    """이 프로세스의 해당 사용자 개인 일정 캐시를 비우고 읽기를 잠시 프라이머리로 고정"""
+    _SCHEDULE_CACHE.invalidate_user(user_id)
+    _REPLICAS.note_write(user_id)
+
+
+def _on_schedule_write(user_id: Optional[str]) -> None:
+    """smu_schedule 쓰기(추가/삭제) commit 직후 호출 — 멀티 워커면 다른 워커에도 같은 무효화를 전달"""
+    _apply_user_write(user_id)
+    _broadcast_user_write(user_id)
+
+
+def _prepare_schedule_entry(
+    start_datetime: str,
+    content: str,
+    user_id: str,
+    end_datetime: Optional[str] = None
+) -> dict:
+    """단건/일괄 등록 공통 입력 검증: 잘못된 입력이면 ValueError"""
+    # 1) Parse/validate datetimes
+    start_dt = _coerce_to_kst(start_datetime)
+    end_dt = _coerce_to_kst(end_datetime) if end_datetime else start_dt
+    if end_dt < start_dt:
+        raise ValueError("end_datetime must be equal to or later than start_datetime.")
+
+    # 2) Set type and user_id (always personal)
+    return {
+        "start_dt": start_dt,
+        "end_dt": end_dt,
+        "content": content,
+        "type": "personal",
+        "user_id": user_id,
+        "created_at": datetime.now(KST),
+    }
+
+
+def _schedule_insert_params(entry: dict) -> tuple:
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return (
+        entry["start_dt"].strftime(fmt),
+        entry["end_dt"].strftime(fmt),
+        entry["content"],
+        entry["type"],
+        entry["user_id"],
+        entry["created_at"].strftime(fmt),
+    )
+
+
+def _schedule_result(entry: dict, inserted_id) -> dict:
+    return {
+        "ok": True,
+        "id": inserted_id,
+        "start_date_iso": entry["start_dt"].isoformat(),
+        "end_date_iso": entry["end_dt"].isoformat(),
+        "content": entry["content"],
+        "type": entry["type"],
+        "user_id": entry["user_id"],
+        "created_at_iso": entry["created_at"].isoformat(),
+    }
+
+
+_SCHEDULE_INSERT_SQL = """
+    INSERT INTO smu_schedule (start_date, end_date, content, type, user_id, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def _add_schedule_structured(
+    start_datetime: str,
+    content: str,
+    user_id: str,
+    end_datetime: Optional[str] = None
+) -> dict:
+    entry = _prepare_schedule_entry(start_datetime, content, user_id, end_datetime)
+
+    # 3) DB insert
+    try:
+        with _get_conn() as conn:
+            conn.begin()
+            with conn.cursor() as cur:
+                cur.execute(_SCHEDULE_INSERT_SQL, _schedule_insert_params(entry))
+                conn.commit()  # 풀 커넥션은 autocommit이므로 begin()으로 연 트랜잭션을 명시적으로 commit
+                inserted_id = cur.lastrowid
+        _on_schedule_write(user_id)
+    except Exception as e:
+        # 롤백은 풀(_get_conn)이 예외 발생 시 처리
+        raise RuntimeError(f"Failed to insert schedule: {e}")
+
+    return _schedule_result(entry, inserted_id)
 
 @mcp.tool()
-def add_smu_schedule_structured(
+async def add_smu_schedule_structured(
     start_datetime: str,
     content: str,
     user_id: str,
@@ -353,117 +3202,702 @@ def add_smu_schedule_structured(
     Returns:
         dict: { ok, id, start_date_iso, end_date_iso, content, type, user_id, created_at_iso }
     """
-    # 1) Parse/validate datetimes
-    start_dt = _coerce_to_kst(start_datetime)
-    end_dt = _coerce_to_kst(end_datetime) if end_datetime else start_dt
-    if end_dt < start_dt:
-        raise ValueError("end_datetime must be equal to or later than start_datetime.")
+    return await _run_db(_add_schedule_structured, start_datetime, content, user_id, end_datetime)
 
-    created_at = datetime.now(KST)
-    
-    # 2) Set type and user_id (always personal)
-    schedule_type = "personal"
-    final_user_id = user_id
 
-    # 3) DB insert
-    conn = pymysql.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-        database=DB_NAME, port=DB_PORT, cursorclass=DictCursor, charset="utf8mb4"
-    )
+def _delete_schedule_by_content(
+    content_keyword: str, user_id: str, dry_run: bool = False, max_delete: Optional[int] = None
+) -> dict:
+    """
+    SELECT ... FOR UPDATE로 대상 행을 잠그고 골라낸 뒤 기본키로만 DELETE (한 트랜잭션).
+    - LIKE 스캔은 한 번만, 조회와 삭제 사이에 끼어든 행이 보고 없이 지워지지 않음
+    - max_delete를 주면 일치 건수가 그보다 많을 때 아무것도 지우지 않고 알림 (None이면 제한 없음)
+    """
+    select_sql = """
+        SELECT id, start_date, end_date, content
+        FROM smu_schedule
+        WHERE content LIKE %s AND type = 'personal' AND user_id = %s
+        ORDER BY id
+    """
+    args = [f"%{content_keyword}%", user_id]
+    if max_delete is not None:
+        max_delete = max(1, int(max_delete))
+        select_sql += " LIMIT %s"
+        args.append(max_delete + 1)
     try:
-        with conn.cursor() as cur:
-            sql = """
-                INSERT INTO smu_schedule (start_date, end_date, content, type, user_id, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            cur.execute(
-                sql,
-                (
-                    start_dt.strftime("%Y-%m-%d %H:%M:%S"),
-                    end_dt.strftime("%Y-%m-%d %H:%M:%S"),
-                    content,
-                    schedule_type,
-                    final_user_id,
-                    created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ),
-            )
-            conn.commit()  # autocommit이 없으므로 명시적으로 commit
-            inserted_id = cur.lastrowid
-    except Exception as e:
-        conn.rollback()
-        raise RuntimeError(f"Failed to insert schedule: {e}")
-    finally:
-        conn.close()
+        with _get_conn() as conn:
+            with conn.cursor() as cur:
+                if dry_run:
+                    # 미리보기는 잠금 없이 일반 조회
+                    cur.execute(select_sql, args)
+                    matching_records = cur.fetchall()
+                else:
+                    conn.begin()
+                    cur.execute(select_sql + " FOR UPDATE", args)
+                    matching_records = cur.fetchall()
 
-    return {
-        "ok": True,
-        "id": inserted_id,
-        "start_date_iso": start_dt.isoformat(),
-        "end_date_iso": end_dt.isoformat(),
-        "content": content,
-        "type": schedule_type,
-        "user_id": final_user_id,
-        "created_at_iso": created_at.isoformat(),
-    }
+                if not matching_records:
+                    return {
+                        "ok": False,
+                        "dry_run": dry_run,
+                        "deleted_count": 0,
+                        "deleted_ids": [],
+                        "message": f"No personal schedules found with keyword: {content_keyword} for user_id: {user_id}"
+                    }
+                if max_delete is not None and len(matching_records) > max_delete:
+                    return {
+                        "ok": False,
+                        "dry_run": dry_run,
+                        "deleted_count": 0,
+                        "deleted_ids": [],
+                        "message": (
+                            f"More than {max_delete} personal schedules match keyword: {content_keyword}. "
+                            "Nothing was deleted; use a more specific keyword or raise max_delete."
+                        ),
+                    }
+
+                deleted_ids = [record['id'] for record in matching_records]
+                deleted_contents = [record['content'] for record in matching_records]
+                if not dry_run:
+                    # 잠근 행만 기본키로 삭제 후 즉시 commit (잠금 유지 시간 최소화)
+                    cur.execute(
+                        f"DELETE FROM smu_schedule WHERE id IN ({', '.join(['%s'] * len(deleted_ids))})",
+                        deleted_ids,
+                    )
+                    conn.commit()
 
+                verb = "Would delete" if dry_run else "Successfully deleted"
+                result = {
+                    "ok": True,
+                    "dry_run": dry_run,
+                    "deleted_count": len(deleted_ids),
+                    "deleted_ids": deleted_ids,
+                    "deleted": matching_records,
+                    "message": f"{verb} {len(deleted_ids)} personal schedules: {', '.join(deleted_contents[:3])}{'...' if len(deleted_contents) > 3 else ''}"
+                }
+        # 연결을 풀에 돌려준 뒤 캐시 무효화/다른 워커 알림
+        if not dry_run:
+            _on_schedule_write(user_id)
+        return result
+    except Exception as e:
+        # 롤백은 풀(_get_conn)이 예외 발생 시 처리 (commit 없이 반환된 트랜잭션도 반납 시 롤백)
+        raise RuntimeError(f"Failed to delete schedules: {e}")
 
 @mcp.tool()
-def delete_smu_schedule_by_content(content_keyword: str, user_id: str) -> dict:
+async def delete_smu_schedule_by_content(
+    content_keyword: str, user_id: str, dry_run: bool = False, max_delete: Optional[int] = None
+) -> dict:
     """
     내용 키워드로 개인 일정을 삭제하는 도구. (type='personal'인 일정만 삭제 가능)
     
     Args:
         content_keyword (str): 삭제할 일정의 내용에 포함된 키워드
         user_id (str): student ID (학번). 해당 사용자의 개인 일정만 삭제 가능
+        dry_run (bool): True면 삭제하지 않고 삭제될 일정만 미리 보여줌
+        max_delete (int, optional): 한 번에 삭제할 최대 건수. 주면 일치 건수가 이보다 많을 때 아무것도 삭제하지 않음 (기본: 제한 없음)
         
     Returns:
-        dict: { ok, deleted_count, deleted_ids, message }
+        dict: { ok, dry_run, deleted_count, deleted_ids, deleted, message }
+              deleted = 실제로 삭제된(또는 dry_run 시 삭제될) 일정 목록
+    """
+    return await _run_db(_delete_schedule_by_content, content_keyword, user_id, dry_run, max_delete)
+
+
+# ---- 일괄(batch) 도구 ----
+# 일주일치 식단 / 여러 일정 등록·삭제를 MCP 왕복 N번 대신 한 번의 호출 + 한 번의 쿼리로 처리
+MEAL_RANGE_MAX_DAYS = int(os.getenv("MEAL_RANGE_MAX_DAYS", "31"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "100"))
+
+
+def _query_meals_range(start_date: str, end_date: str, categories: Optional[list[str]] = None) -> dict:
+    start = _coerce_to_kst(start_date).date()
+    end = _coerce_to_kst(end_date).date()
+    if end < start:
+        raise ValueError("end_date must be equal to or later than start_date.")
+    days = (end - start).days + 1
+    if days > MEAL_RANGE_MAX_DAYS:
+        raise ValueError(f"Date range too long: {days} days (max {MEAL_RANGE_MAX_DAYS}).")
+    cats = [c.strip().lower() for c in (categories or MEAL_CATEGORIES) if c and c.strip()]
+
+    rows, snapshot = _read_meals_by_date_range(start.isoformat(), end.isoformat())
+    grid = {
+        (start + timedelta(days=i)).isoformat(): {c: [] for c in cats}
+        for i in range(days)
+    }
+    for row in rows:
+        d, c = _meal_cache_key(_normalize_meal_date(row.get("date")) or "", row.get("category") or "")
+        if d in grid and c in grid[d]:
+            grid[d][c].append(row)
+
+    # 단건 조회(query_smu_meals_by_date_category)도 바로 캐시 히트가 되도록 채워 둔다
+    if MEAL_CACHE_ENABLED:
+        for d, by_cat in grid.items():
+            for c, cell in by_cat.items():
+                _MEAL_CACHE.set((d, c), cell)
+    result = {"start_date": start.isoformat(), "end_date": end.isoformat(), "categories": cats, "days": grid}
+    if snapshot is not None:
+        result["snapshot"] = snapshot
+    return result
+
+
+@mcp.tool()
+async def query_smu_meals_range(
+    start_date: str, end_date: str, categories: Optional[list[str]] = None, format: str = "rows"
+) -> dict:
+    """
+    기간(start_date ~ end_date, 포함)의 식단을 한 번에 조회해 날짜 x 카테고리 표로 반환한다.
+    Args:
+        start_date: '2025-10-20' 같은 ISO 날짜 문자열
+        end_date: '2025-10-26' 같은 ISO 날짜 문자열 (최대 MEAL_RANGE_MAX_DAYS일)
+        categories: ['breakfast', 'lunch', 'dinner'] 중 일부 (생략 시 전체)
+        format: 'rows'(기본) | 'columnar'({ columns, rows: [[...]] }) | 'compact'(null/빈 값 제거, 긴 텍스트 축약) — 날짜 x 카테고리 칸마다 적용
+    Returns:
+        dict: { start_date, end_date, categories, days: { 'YYYY-MM-DD': { category: [레코드...] } } }
     """
-    conn = pymysql.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-        database=DB_NAME, port=DB_PORT, cursorclass=DictCursor, charset="utf8mb4"
+    fmt = _check_format(format)
+    key = (
+        "query_smu_meals_range",
+        _normalize_meal_date(start_date),
+        _normalize_meal_date(end_date),
+        tuple(c.strip().lower() for c in categories if c and c.strip()) if categories else None,
     )
+    result = await _run_db_shared(key, _query_meals_range, start_date, end_date, categories)
+    if fmt != "rows":
+        days = {d: {c: _shape_rows(rows, fmt) for c, rows in cells.items()} for d, cells in result["days"].items()}
+        result = {**result, "days": days}
+    return _respond(result, fmt)
+
+
+def _add_schedules_bulk(entries: list[dict], user_id: str) -> dict:
+    if len(entries) > BULK_MAX_ITEMS:
+        raise ValueError(f"Too many entries: {len(entries)} (max {BULK_MAX_ITEMS}).")
+
+    # 1) 항목별 검증 — 실패한 항목만 오류로 보고하고 나머지는 계속 진행
+    results: list[Optional[dict]] = [None] * len(entries)
+    valid: list[tuple[int, dict]] = []
+    for i, item in enumerate(entries):
+        try:
+            if not isinstance(item, dict) or not item.get("start_datetime") or "content" not in item:
+                raise ValueError("Each entry needs 'start_datetime' and 'content'.")
+            entry = _prepare_schedule_entry(
+                item["start_datetime"], item["content"], user_id, item.get("end_datetime")
+            )
+            valid.append((i, entry))
+        except Exception as e:
+            results[i] = {"index": i, "ok": False, "error": str(e)}
+
+    # 2) 유효한 항목은 트랜잭션 하나로 등록 (커넥션/커밋 1회)
+    # 다중 행 INSERT의 AUTO_INCREMENT 값은 연속이라는 보장이 없으므로
+    # (innodb_autoinc_lock_mode=2, auto_increment_increment > 1, 드라이버의 배치 분할) 행마다 INSERT 후 lastrowid를 기록
+    if valid:
+        try:
+            ids = []
+            with _get_conn() as conn:
+                conn.begin()
+                with conn.cursor() as cur:
+                    for _, entry in valid:
+                        cur.execute(_SCHEDULE_INSERT_SQL, _schedule_insert_params(entry))
+                        ids.append(cur.lastrowid)
+                conn.commit()
+            _on_schedule_write(user_id)
+            for (i, entry), new_id in zip(valid, ids):
+                results[i] = {"index": i, **_schedule_result(entry, new_id)}
+        except Exception as e:
+            for i, _ in valid:
+                results[i] = {"index": i, "ok": False, "error": f"Failed to insert schedule: {e}"}
+
+    inserted = [r for r in results if r and r["ok"]]
+    return {
+        "ok": len(inserted) == len(entries),
+        "inserted_count": len(inserted),
+        "failed_count": len(entries) - len(inserted),
+        "results": results,
+    }
+
+
+@mcp.tool()
+async def add_smu_schedules_bulk(entries: list[dict], user_id: str) -> dict:
+    """
+    여러 개인 일정을 한 번에 등록한다. (add_smu_schedule_structured와 같은 입력 검증)
+
+    Args:
+        entries (list[dict]): [{ "start_datetime": str, "content": str, "end_datetime": str (optional) }, ...]
+                              (최대 BULK_MAX_ITEMS개)
+        user_id (str): student ID (학번). Required parameter.
+
+    Returns:
+        dict: { ok, inserted_count, failed_count, results: [{ index, ok, id, ... } | { index, ok: false, error }] }
+              잘못된 항목은 해당 항목만 실패로 보고하고 나머지는 등록된다.
+    """
+    return await _run_db(_add_schedules_bulk, entries, user_id)
+
+
+def _delete_schedules_by_ids(ids: list[int], user_id: str) -> dict:
+    if len(ids) > BULK_MAX_ITEMS:
+        raise ValueError(f"Too many ids: {len(ids)} (max {BULK_MAX_ITEMS}).")
+    wanted = list(dict.fromkeys(int(i) for i in ids))
+    if not wanted:
+        return {"ok": False, "deleted_count": 0, "deleted_ids": [], "errors": [], "message": "No ids given"}
+
+    placeholders = ", ".join(["%s"] * len(wanted))
     try:
-        with conn.cursor() as cur:
-            # 먼저 해당 키워드와 일치하는 개인 일정들을 조회 (type='personal'이고 user_id가 일치하는 것만)
-            select_sql = """
-                SELECT id, content, type, user_id 
-                FROM smu_schedule 
-                WHERE content LIKE %s AND type = 'personal' AND user_id = %s
-            """
-            cur.execute(select_sql, (f"%{content_keyword}%", user_id))
-            matching_records = cur.fetchall()
-            
-            if not matching_records:
-                return {
-                    "ok": False,
-                    "deleted_count": 0,
-                    "deleted_ids": [],
-                    "message": f"No personal schedules found with keyword: {content_keyword} for user_id: {user_id}"
-                }
-            
-            # 개인 일정들만 삭제 (type='personal'이고 user_id가 일치하는 것만)
-            delete_sql = """
-                DELETE FROM smu_schedule 
-                WHERE content LIKE %s AND type = 'personal' AND user_id = %s
-            """
-            cur.execute(delete_sql, (f"%{content_keyword}%", user_id))
+        with _get_conn() as conn:
+            conn.begin()
+            with conn.cursor() as cur:
+                # 본인 개인 일정만 잠그고 골라낸 뒤 그 id만 삭제
+                cur.execute(
+                    f"""
+                    SELECT id FROM smu_schedule
+                    WHERE id IN ({placeholders}) AND type = 'personal' AND user_id = %s
+                    FOR UPDATE
+                    """,
+                    (*wanted, user_id),
+                )
+                owned = [r["id"] for r in cur.fetchall()]
+                if owned:
+                    cur.execute(
+                        f"DELETE FROM smu_schedule WHERE id IN ({', '.join(['%s'] * len(owned))})",
+                        owned,
+                    )
             conn.commit()
-            
-            deleted_ids = [record['id'] for record in matching_records]
-            deleted_contents = [record['content'] for record in matching_records]
-            
-            return {
-                "ok": True,
-                "deleted_count": len(deleted_ids),
-                "deleted_ids": deleted_ids,
-                "message": f"Successfully deleted {len(deleted_ids)} personal schedules: {', '.join(deleted_contents[:3])}{'...' if len(deleted_contents) > 3 else ''}"
-            }
+        if owned:
+            _on_schedule_write(user_id)
     except Exception as e:
-        conn.rollback()
         raise RuntimeError(f"Failed to delete schedules: {e}")
-    finally:
-        conn.close()
+
+    owned_set = set(owned)
+    errors = [
+        {"id": i, "error": f"No personal schedule with id {i} for user_id: {user_id}"}
+        for i in wanted if i not in owned_set
+    ]
+    return {
+        "ok": not errors,
+        "deleted_count": len(owned),
+        "deleted_ids": [i for i in wanted if i in owned_set],
+        "errors": errors,
+        "message": f"Deleted {len(owned)} of {len(wanted)} requested personal schedules",
+    }
+
+
+@mcp.tool()
+async def delete_smu_schedules_by_ids(ids: list[int], user_id: str) -> dict:
+    """
+    id 목록으로 개인 일정을 한 번에 삭제한다. (type='personal'이고 user_id가 일치하는 일정만)
+
+    Args:
+        ids (list[int]): 삭제할 일정 id 목록 (최대 BULK_MAX_ITEMS개)
+        user_id (str): student ID (학번). 해당 사용자의 개인 일정만 삭제 가능
+
+    Returns:
+        dict: { ok, deleted_count, deleted_ids, errors: [{ id, error }], message }
+              없거나 본인 일정이 아닌 id는 errors에 보고하고 나머지는 삭제된다.
+    """
+    return await _run_db(_delete_schedules_by_ids, ids, user_id)
+
+
+# ---- 오늘 요약(digest) ----
+# '오늘' 질문마다 now_kr → 식단 → 일정 → 공지 순으로 3~4번 왕복하지 않도록,
+# 오늘의 식단(조식/중식/석식) + 오늘의 common 일정 + 최신 공지 N건을 미리 만들어 메모리에 둔다.
+# KST 자정과 DIGEST_REFRESH 주기마다 다시 만들고, 내용이 바뀐 경우에만 version/etag가 바뀐다.
+DIGEST_ENABLED = _env_flag("DIGEST_ENABLED", True)
+DIGEST_REFRESH = float(os.getenv("DIGEST_REFRESH", "300"))  # 데이터 변경 확인 주기(초)
+DIGEST_NOTICES = int(os.getenv("DIGEST_NOTICES", "5"))       # 포함할 최신 공지 수
+
+
+def _build_today_digest() -> dict:
+    now = datetime.now(KST)
+    today = now.date().isoformat()
+    rows, _ = _read_meals_by_date_range(today, today)
+    meals: dict[str, list[dict]] = {c: [] for c in MEAL_CATEGORIES}
+    for row in rows:
+        _, category = _meal_cache_key(today, row.get("category") or "")
+        meals.setdefault(category, []).append(row)
+    start = _day_start(now.year, now.month, now.day)
+    schedule = _query_schedule_by_date_range(start, start + timedelta(days=1))
+    notices = _query_page("smu_notices", "1 = 1", [], [("id", "DESC")], DIGEST_NOTICES, None, None)["rows"]
+    return {"date": today, "weekday": now.strftime("%A"), "meals": meals, "schedule": schedule, "notices": notices}
+
+
+class DailyDigest:
+    """
+    메모리에 보관하는 '오늘' 요약.
+    etag는 내용(JSON)의 해시, version은 etag가 바뀔 때마다 1 증가 — 클라이언트는 etag가 같으면 다시 받지 않아도 된다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digest: Optional[dict] = None
+        self._json: Optional[str] = None
+        self.version = 0
+
+    def refresh(self) -> tuple[dict, bool]:
+        """
+        다시 만들어 (digest, 내용이 바뀌었는지)를 반환.
+        빌드 도중 KST 자정이 지나면 current()는 None이 되므로 호출 측은 반환된 digest를 그대로 쓴다.
+        """
+        content = _read_on_replica(_build_today_digest)
+        body = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        etag = hashlib.sha256(body.encode()).hexdigest()[:16]
+        with self._lock:
+            if self._digest is not None and self._digest["etag"] == etag:
+                return self._digest, False
+            self.version += 1
+            digest = {
+                **content,
+                "version": self.version,
+                "etag": etag,
+                "generated_at": datetime.now(KST).isoformat(),
+            }
+            self._digest = digest
+            self._json = json.dumps(digest, ensure_ascii=False, indent=2, default=str)
+        logger.info("today digest v%d (%s) built for %s", digest["version"], etag, content["date"])
+        return digest, True
+
+    @staticmethod
+    def _is_today(digest: Optional[dict]) -> bool:
+        return digest is not None and digest["date"] == datetime.now(KST).date().isoformat()
+
+    def current(self) -> Optional[dict]:
+        """오늘 날짜의 digest (아직 없거나 날짜가 지났으면 None)"""
+        with self._lock:
+            digest = self._digest
+        return digest if self._is_today(digest) else None
+
+    def section_json(self, section: Optional[str] = None, digest: Optional[dict] = None) -> Optional[str]:
+        """
+        digest 전체(section=None) 또는 한 섹션의 JSON.
+        digest를 주지 않으면 current()와 같이 날짜를 확인해 자정이 지난 digest는 내보내지 않는다(None).
+        """
+        with self._lock:
+            held, encoded = self._digest, self._json
+        if digest is None:
+            if not self._is_today(held):
+                return None
+            digest = held
+        if section is None:
+            if digest is held:
+                return encoded
+            return json.dumps(digest, ensure_ascii=False, indent=2, default=str)
+        return json.dumps(
+            {"date": digest["date"], "version": digest["version"], "etag": digest["etag"], section: digest[section]},
+            ensure_ascii=False, indent=2, default=str,
+        )
+
+
+_DIGEST = DailyDigest()
+
+
+async def _current_digest() -> dict:
+    digest = _DIGEST.current()
+    if digest is None:
+        # 첫 호출이거나 자정 직후 아직 갱신 전이면 바로 만든다 (동시 호출은 한 번으로 병합)
+        digest, _ = await _SINGLE_FLIGHT.run(("today_digest",), lambda: _run_db(_DIGEST.refresh))
+    return digest
+
+
+def _digest_loop() -> None:
+    while True:
+        try:
+            _DIGEST.refresh()
+            _READINESS.mark("digest")
+        except Exception as e:
+            _READINESS.fail("digest", e)
+            logger.warning("today digest refresh failed: %s", e)
+        time.sleep(min(DIGEST_REFRESH, _seconds_until_kst_midnight() + 1))
+
+
+@mcp.tool()
+async def today_digest(if_none_match: Optional[str] = None) -> dict:
+    """
+    오늘(KST)의 요약을 한 번에 반환: 현재 시각, 조식/중식/석식, 오늘의 common 일정, 최신 공지.
+    now_kr + 식단 + 일정 + 공지 조회를 각각 호출할 필요 없이 이 도구 하나로 충분하다. (개인 일정은 포함하지 않음)
+    Args:
+        if_none_match: 이전 응답의 etag. 내용이 그대로면 본문 없이 { not_modified: true } 만 반환
+    Returns:
+        dict: { now, date, weekday, meals: {breakfast, lunch, dinner}, schedule, notices, version, etag, generated_at }
+    """
+    digest = await _current_digest()
+    if if_none_match and if_none_match == digest["etag"]:
+        return {"now": now_kr(), "not_modified": True, "version": digest["version"], "etag": digest["etag"]}
+    return {"now": now_kr(), **digest}
+
+
+@mcp.resource(
+    "smus://digest/today", name="today_digest", mime_type="application/json",
+    description="Today's (KST) meals, common schedule and latest notices with version/etag.",
+)
+async def today_digest_resource() -> str:
+    digest = await _current_digest()
+    return _DIGEST.section_json(digest=digest)
+
+
+@mcp.resource("smus://digest/today/meals", name="today_meals", mime_type="application/json",
+              description="Today's breakfast/lunch/dinner (KST).")
+async def today_meals_resource() -> str:
+    digest = await _current_digest()
+    return _DIGEST.section_json("meals", digest)
+
+
+@mcp.resource("smus://digest/today/schedule", name="today_schedule", mime_type="application/json",
+              description="Today's common schedule entries (KST).")
+async def today_schedule_resource() -> str:
+    digest = await _current_digest()
+    return _DIGEST.section_json("schedule", digest)
+
+
+@mcp.resource("smus://digest/today/notices", name="latest_notices", mime_type="application/json",
+              description="Latest SMU notices.")
+async def latest_notices_resource() -> str:
+    digest = await _current_digest()
+    return _DIGEST.section_json("notices", digest)
+
+
+# ---- 변경 감지 (change feed) / 리소스 구독 알림 ----
+# 크롤러가 smu_notices / smu_meals 등을 서버 밖에서 갱신하면 메모리 캐시·인덱스가 다음 주기까지 조용히 낡는다.
+# 테이블마다 값싼 워터마크(MAX(id), MAX(created_at), COUNT(*))를 CHANGE_FEED_INTERVAL마다 읽어
+# 바뀐 테이블에 해당하는 캐시 항목/인덱스/스냅샷/오늘 요약만 갱신하고,
+# resources/subscribe로 구독한 세션에 notifications/resources/updated를 보낸다.
+# (예: smus://digest/today/notices 구독 → 새 공지가 들어오면 알림, 도구를 반복 호출할 필요 없음)
+CHANGE_FEED_ENABLED = _env_flag("CHANGE_FEED_ENABLED", True)
+CHANGE_FEED_INTERVAL = float(os.getenv("CHANGE_FEED_INTERVAL", "30"))  # 워터마크 확인 주기(초)
+
+# 테이블 → 감시 조건 (personal 일정은 이 서버를 통한 쓰기에서 이미 무효화하므로 common만 감시)
+_CHANGE_FEED_TABLES = {
+    "smu_notices": "1 = 1",
+    "smu_meals": "1 = 1",
+    "smu_exam": "1 = 1",
+    "smu_schedule": "type = 'common'",
+}
+# 테이블 → 오늘 요약의 섹션 (바뀌면 요약을 다시 만들고 해당 리소스에 알림)
+_DIGEST_SECTIONS = {"smu_notices": "notices", "smu_meals": "meals", "smu_schedule": "schedule"}
+
+_TABLE_CHANGES = METRICS.counter("smus_change_feed_changes_total", "Out-of-band table changes detected by the change feed.")
+_RESOURCE_NOTIFICATIONS = METRICS.counter(
+    "smus_resource_notifications_total", "resources/updated notifications sent to subscribed sessions."
+)
+
+
+class ChangeFeed:
+    """테이블별 워터마크를 비교해 바뀐 테이블을 찾는다 (첫 poll은 기준점만 기록)."""
+
+    def __init__(self, tables: dict[str, str]):
+        self.tables = tables
+        self._lock = threading.Lock()
+        self._marks: dict[str, dict] = {}
+        self._changed_at: dict[str, str] = {}
+        self._has_created_at: dict[str, bool] = {}
+
+    def _watermark(self, cur, table: str) -> dict:
+        where = self.tables[table]
+        if self._has_created_at.get(table, True):
+            try:
+                cur.execute(
+                    f"SELECT MAX(id) AS max_id, MAX(created_at) AS max_created_at, COUNT(*) AS cnt FROM {table} WHERE {where}"
+                )
+                self._has_created_at[table] = True
+                return dict(cur.fetchone())
+            except pymysql.MySQLError as e:
+                if not (e.args and e.args[0] == 1054):
+                    raise
+                self._has_created_at[table] = False  # created_at 컬럼이 없는 테이블
+        cur.execute(f"SELECT MAX(id) AS max_id, NULL AS max_created_at, COUNT(*) AS cnt FROM {table} WHERE {where}")
+        return dict(cur.fetchone())
+
+    def poll(self) -> dict[str, tuple[dict, dict]]:
+        """바뀐 테이블 → (이전 워터마크, 새 워터마크)"""
+        with _get_conn() as conn:
+            with conn.cursor() as cur:
+                marks = {table: self._watermark(cur, table) for table in self.tables}
+        changed = {}
+        now = datetime.now(KST).isoformat()
+        with self._lock:
+            for table, mark in marks.items():
+                old = self._marks.get(table)
+                if old is not None and old != mark:
+                    changed[table] = (old, mark)
+                    self._changed_at[table] = now
+                self._marks[table] = mark
+        return changed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                t: {**m, "changed_at": self._changed_at.get(t)} for t, m in self._marks.items()
+            }
+
+
+_CHANGE_FEED = ChangeFeed(_CHANGE_FEED_TABLES)
+
+
+class ResourceSubscriptions:
+    """
+    resources/subscribe로 등록된 (uri → 세션) 목록.
+    세션이 끝나면 자동으로 빠지도록 WeakKeyDictionary에 세션별 이벤트 루프를 보관하고,
+    백그라운드 스레드에서는 run_coroutine_threadsafe로 그 루프에 알림 전송을 넘긴다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: dict[str, weakref.WeakKeyDictionary] = {}
+
+    def add(self, uri: str, session, loop) -> None:
+        with self._lock:
+            self._subs.setdefault(uri, weakref.WeakKeyDictionary())[session] = loop
+
+    def remove(self, uri: str, session) -> None:
+        with self._lock:
+            subs = self._subs.get(uri)
+            if subs is not None:
+                subs.pop(session, None)
+
+    def notify(self, uris) -> int:
+        with self._lock:
+            targets = [(uri, s, loop) for uri in uris for s, loop in list(self._subs.get(uri, {}).items())]
+        for uri, session, loop in targets:
+            asyncio.run_coroutine_threadsafe(self._send(uri, session), loop)
+        return len(targets)
+
+    async def _send(self, uri: str, session) -> None:
+        try:
+            await session.send_resource_updated(AnyUrl(uri))
+            _RESOURCE_NOTIFICATIONS.inc(uri=uri)
+        except Exception as e:
+            logger.info("dropping resource subscription %s: %s", uri, e)
+            self.remove(uri, session)
+
+    def count(self) -> dict[str, int]:
+        with self._lock:
+            return {uri: len(subs) for uri, subs in self._subs.items() if len(subs)}
+
+
+_SUBSCRIPTIONS = ResourceSubscriptions()
+
+
+@mcp._mcp_server.subscribe_resource()
+async def _subscribe_resource(uri: AnyUrl) -> None:
+    _SUBSCRIPTIONS.add(str(uri), mcp._mcp_server.request_context.session, asyncio.get_running_loop())
+
+
+@mcp._mcp_server.unsubscribe_resource()
+async def _unsubscribe_resource(uri: AnyUrl) -> None:
+    _SUBSCRIPTIONS.remove(str(uri), mcp._mcp_server.request_context.session)
+
+
+# 저수준 서버는 구독 핸들러가 있어도 resources.subscribe=false로 광고하므로 초기화 응답만 보정한다
+_base_get_capabilities = mcp._mcp_server.get_capabilities
+
+
+def _get_capabilities_with_subscribe(notification_options, experimental_capabilities):
+    caps = _base_get_capabilities(notification_options, experimental_capabilities)
+    if caps.resources is not None:
+        caps.resources.subscribe = True
+    return caps
+
+
+mcp._mcp_server.get_capabilities = _get_capabilities_with_subscribe
+
+
+def _changed_meal_keys(old: dict, new: dict) -> Optional[set]:
+    """새로 들어오거나 갱신된 식단의 (날짜, 카테고리) 캐시 키. 삭제가 섞였으면 None(전체 무효화)"""
+    with _get_conn() as conn:
+        with conn.cursor() as cur:
+            if old.get("max_created_at") is not None:
+                cur.execute(
+                    "SELECT id, `date`, category FROM smu_meals WHERE id > %s OR created_at > %s",
+                    (old["max_id"] or 0, old["max_created_at"]),
+                )
+            else:
+                cur.execute("SELECT id, `date`, category FROM smu_meals WHERE id > %s", (old["max_id"] or 0,))
+            rows = cur.fetchall()
+    inserted = sum(1 for r in rows if r["id"] > (old["max_id"] or 0))
+    if new["cnt"] != old["cnt"] + inserted:
+        return None
+    return {_meal_cache_key(_normalize_meal_date(r["date"]) or "", r["category"] or "") for r in rows}
+
+
+def _apply_table_changes(changed: dict[str, tuple[dict, dict]]) -> set[str]:
+    """바뀐 테이블에 해당하는 것만 갱신하고, 알림을 보낼 리소스 uri 집합을 반환"""
+    uris = {"smus://changes"}
+    for table, (old, new) in changed.items():
+        _TABLE_CHANGES.inc(table=table)
+        logger.info("change feed: %s %s -> %s", table, old, new)
+        # 스냅샷을 먼저 맞춰야 무효화 직후의 재조회가 낡은 스냅샷에서 다시 채워지지 않는다.
+        # 0번이 아닌 워커(또는 갱신 실패)는 스냅샷이 새 워터마크를 반영할 때까지 이 테이블을 DB에서 읽는다
+        if _SNAPSHOT is not None and table in _SNAPSHOT.tables:
+            try:
+                if WORKER_INDEX == 0:
+                    _read_on_replica(_SNAPSHOT.refresh_table, table)
+                else:
+                    _SNAPSHOT.open()
+            except Exception as e:
+                logger.warning("snapshot refresh after change failed (%s): %s", table, e)
+            if not _SNAPSHOT.matches(table, new):
+                _SNAPSHOT.hold(table, new)
+        for index in _SEARCH_INDEXES.values():
+            if SEARCH_INDEX_ENABLED and index.table == table:
+                try:
+                    _read_on_replica(index.refresh)
+                except Exception as e:
+                    logger.warning("search index refresh after change failed (%s): %s", table, e)
+        if table == "smu_meals" and MEAL_CACHE_ENABLED:
+            try:
+                keys = _read_on_replica(_changed_meal_keys, old, new)
+            except Exception as e:
+                logger.warning("meal change lookup failed, clearing meal cache: %s", e)
+                keys = None
+            if keys is None:
+                _MEAL_CACHE.invalidate()
+            else:
+                for key in keys:
+                    _MEAL_CACHE.invalidate(key)
+        if table == "smu_schedule":
+            _SCHEDULE_CACHE.invalidate_common()
+    sections = {_DIGEST_SECTIONS[t] for t in changed if t in _DIGEST_SECTIONS}
+    if DIGEST_ENABLED and sections:
+        try:
+            _, changed_digest = _DIGEST.refresh()
+            if changed_digest:
+                uris.add("smus://digest/today")
+                uris.update(f"smus://digest/today/{s}" for s in sections)
+        except Exception as e:
+            logger.warning("today digest refresh after change failed: %s", e)
+    return uris
+
+
+def _change_feed_loop() -> None:
+    while True:
+        if _SNAPSHOT is not None and WORKER_INDEX != 0:
+            try:
+                _SNAPSHOT.open()  # 0번 워커가 파일을 갱신했는지 확인
+            except Exception as e:
+                logger.warning("snapshot reload failed: %s", e)
+        if _SNAPSHOT is not None:
+            for table in _SNAPSHOT.release_caught_up():
+                logger.info("snapshot caught up with change feed: %s", table)
+        try:
+            changed = _read_on_replica(_CHANGE_FEED.poll)
+            if changed:
+                sent = _SUBSCRIPTIONS.notify(_apply_table_changes(changed))
+                logger.info("change feed: %s changed, %d notification(s)", sorted(changed), sent)
+        except Exception as e:
+            logger.warning("change feed poll failed: %s", e)
+        time.sleep(CHANGE_FEED_INTERVAL)
+
+
+@mcp.resource(
+    "smus://changes", name="table_watermarks", mime_type="application/json",
+    description="Per-table watermarks (max id, max created_at, row count, last change time); updated on every change.",
+)
+def table_watermarks_resource() -> str:
+    return json.dumps(_CHANGE_FEED.stats(), ensure_ascii=False, indent=2, default=str)
+
+
+@METRICS.collector
+def _subscription_gauges() -> list:
+    return [
+        ("smus_resource_subscriptions", "Sessions subscribed to each resource.",
+         [({"uri": uri}, n) for uri, n in _SUBSCRIPTIONS.count().items()]),
+    ]
 
 
 # ---- 기본 프롬프트(어제/내일 계산 버그 수정) ----
@@ -489,7 +3923,9 @@ def default_prompt(message: str) -> list[base.Message]:
             f"- 'today/오늘' = {today_str}\n"
             f"- 'yesterday/어제' = {yesterday_str}\n"
             f"- 'tomorrow/내일' = {tomorrow_str}\n"
-            "If the user asks for SMU meals for today or a specific date, prefer:\n"
+            "If the user asks about today's SMU meals, today's common schedule or recent notices, call `today_digest` once "
+            "(it already includes the current KST date/time); pass the previous etag as if_none_match to skip unchanged content.\n"
+            "If the user asks for SMU meals for another specific date, prefer:\n"
             "1) Call `now_kr` (get date)\n"
             "2) Then call `query_smu_meals_by_date_category(date_iso, category)`\n"
             "When data includes URLs, always include them in the answer.\n"
@@ -510,11 +3946,336 @@ def default_prompt(message: str) -> list[base.Message]:
         ),
         base.UserMessage(message),
     ]
+# ---- 멀티 워커 (WEB_CONCURRENCY) ----
+# 프로세스 하나는 파이썬 코어 하나만 쓴다. WEB_CONCURRENCY > 1 이면 이 파일을 워커 N개로 띄우고
+# (127.0.0.1:WORKER_BASE_PORT+i), 앞단 프로세스는 PORT에서 세션 고정(session-affine) 프록시만 한다.
+# - 새 세션(mcp-session-id 없음)은 라운드 로빈으로 워커 선택
+# - 워커가 발급한 세션 id 앞에 워커 번호를 붙여('2-<id>') 돌려주므로, 이후 요청은 프록시가 세션 표 없이 같은 워커로 보낸다
+# - 풀/캐시는 워커마다 따로: DB_POOL_TOTAL을 주면 워커당 DB_POOL_SIZE = DB_POOL_TOTAL // N
+# - 스냅샷 파일 갱신은 0번 워커만 하고, 나머지 워커는 같은 파일의 메타데이터만 다시 읽는다
+# - 개인 일정 캐시/read-your-writes 창은 워커별이므로, 일정 쓰기 후 쓴 워커가 다른 워커의 내부 엔드포인트를 호출해 맞춘다
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "9100"))
+WORKER_START_TIMEOUT = float(os.getenv("WORKER_START_TIMEOUT", "30"))  # 워커 기동 대기 한도(초)
+WORKER_INDEX = int(os.getenv("SMUS_WORKER_INDEX", "0"))  # 워커 프로세스에만 설정됨 (단일 프로세스는 0)
+WORKER_COUNT = int(os.getenv("SMUS_WORKER_COUNT", "1"))  # 워커 프로세스에만 설정됨
+_INTERNAL_TOKEN = os.getenv("SMUS_INTERNAL_TOKEN", "")   # 앞단이 기동 시 만들어 워커들에 공유하는 내부 호출 토큰
+_INTERNAL_PREFIX = "/_internal/"
+
+_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"host",
+}
+
+
+def _worker_env(index: int, count: int, token: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        SMUS_WORKER_INDEX=str(index), SMUS_WORKER_COUNT=str(count), SMUS_INTERNAL_TOKEN=token,
+        WEB_CONCURRENCY="1", HOST="127.0.0.1", PORT=str(WORKER_BASE_PORT + index),
+    )
+    total = os.getenv("DB_POOL_TOTAL")
+    if total and "DB_POOL_SIZE" not in os.environ:
+        env["DB_POOL_SIZE"] = str(max(1, int(total) // count))
+    return env
+
+
+def _broadcast_user_write(user_id: Optional[str]) -> None:
+    """
+    다른 워커들의 개인 일정 캐시/read-your-writes 창을 맞춘다.
+    쓰기 도구(와 DB 스레드)가 워커 응답을 기다리지 않도록 별도 스레드에서 보낸다.
+    같은 세션은 항상 같은 워커로 가므로 쓴 세션 자신의 읽기는 _apply_user_write로 이미 보장된다.
+    """
+    if WORKER_COUNT <= 1 or not _INTERNAL_TOKEN or not user_id:
+        return
+    threading.Thread(target=_post_user_write, args=(user_id,), name="smus-user-write", daemon=True).start()
+
+
+def _post_user_write(user_id: str) -> None:
+    """실패한 워커는 로그만 남긴다 — 재시작된 워커는 캐시가 비어 있으므로 문제가 없다."""
+    import http.client
+
+    body = json.dumps({"user_id": user_id}).encode()
+    for i in range(WORKER_COUNT):
+        if i == WORKER_INDEX:
+            continue
+        conn = http.client.HTTPConnection("127.0.0.1", WORKER_BASE_PORT + i, timeout=1)
+        try:
+            conn.request("POST", _INTERNAL_PREFIX + "user-write", body,
+                         {"content-type": "application/json", "x-smus-internal-token": _INTERNAL_TOKEN})
+            conn.getresponse().read()
+        except Exception as e:
+            logger.warning("user write broadcast to worker %d failed: %s", i, e)
+        finally:
+            conn.close()
+
+
+@mcp.custom_route(_INTERNAL_PREFIX + "user-write", methods=["POST"])
+async def internal_user_write(request):
+    """다른 워커가 보낸 일정 쓰기 알림 (앞단 프록시는 /_internal/ 경로를 외부에 열지 않음)"""
+    from starlette.responses import JSONResponse
+
+    if not _INTERNAL_TOKEN or request.headers.get("x-smus-internal-token") != _INTERNAL_TOKEN:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    user_id = (await request.json()).get("user_id")
+    _apply_user_write(user_id)
+    return JSONResponse({"ok": True})
+
+
+def _with_worker_label(line: str, index: int) -> str:
+    brace = line.find("{")
+    space = line.find(" ")
+    if brace == -1 or brace > space:
+        return f'{line[:space]}{{worker="{index}"}}{line[space:]}'
+    sep = "" if line[brace + 1] == "}" else ","
+    return f'{line[:brace + 1]}worker="{index}"{sep}{line[brace + 1:]}'
+
+
+def _merge_metrics(texts: list[tuple[int, str]]) -> str:
+    """워커별 /metrics 텍스트를 메트릭 이름별로 모으고 worker 레이블을 붙인다."""
+    families: dict[str, dict] = {}
+    for index, text in texts:
+        current = None
+        for line in text.splitlines():
+            if line.startswith(("# HELP ", "# TYPE ")):
+                current = families.setdefault(line.split()[2], {"head": [], "samples": []})
+                if line not in current["head"]:
+                    current["head"].append(line)
+            elif line and not line.startswith("#") and current is not None:
+                current["samples"].append(_with_worker_label(line, index))
+    lines = []
+    for fam in families.values():
+        lines += fam["head"] + fam["samples"]
+    return "\n".join(lines) + "\n"
+
+
+class SessionAffineProxy:
+    """
+    WEB_CONCURRENCY > 1 일 때 앞단에서 도는 ASGI 프록시.
+    요청/응답 본문은 버퍼링 없이 그대로 흘려보낸다 (SSE 스트림 포함).
+    """
+
+    def __init__(self, ports: list[int]):
+        self.ports = ports
+        self._rr = itertools.count()
+        self._client = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if scope["path"] == "/metrics":
+                await self._metrics(send)
+            elif scope["path"] == "/readyz":
+                await self._readyz(send)
+            elif scope["path"].startswith(_INTERNAL_PREFIX):
+                await send({"type": "http.response.start", "status": 404, "headers": []})
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await self._forward(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        import httpx
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(10.0, read=None, write=None),
+                    limits=httpx.Limits(max_connections=None, max_keepalive_connections=64),
+                )
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _route(self, headers: list) -> tuple[Optional[int], Optional[bytes]]:
+        """(워커 번호, 워커가 발급한 원래 세션 id). 세션 id 형식이 틀리면 (None, None)"""
+        for k, v in headers:
+            if k == b"mcp-session-id":
+                prefix, _, sid = v.partition(b"-")
+                if not prefix.isdigit() or int(prefix) >= len(self.ports) or not sid:
+                    return None, None
+                return int(prefix), sid
+        return next(self._rr) % len(self.ports), None
+
+    async def _forward(self, scope, receive, send):
+        headers = [(k, v) for k, v in scope["headers"] if k not in _HOP_HEADERS]
+        worker, sid = self._route(headers)
+        if worker is None:
+            await send({"type": "http.response.start", "status": 404,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"error":"unknown session"}'})
+            return
+        if sid is not None:
+            headers = [(k, sid if k == b"mcp-session-id" else v) for k, v in headers]
+
+        async def body():
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                if message.get("body"):
+                    yield message["body"]
+                if not message.get("more_body"):
+                    return
+
+        url = f"http://127.0.0.1:{self.ports[worker]}{scope.get('raw_path', b'').decode() or scope['path']}"
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode()
+        request = self._client.build_request(scope["method"], url, headers=headers, content=body())
+        try:
+            response = await self._client.send(request, stream=True)
+        except Exception as e:
+            logger.warning("worker %d unreachable: %s", worker, e)
+            await send({"type": "http.response.start", "status": 502, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        try:
+            out = []
+            for k, v in response.headers.raw:
+                if k.lower() in _HOP_HEADERS:
+                    continue
+                if k.lower() == b"mcp-session-id":
+                    v = str(worker).encode() + b"-" + v
+                out.append((k, v))
+            await send({"type": "http.response.start", "status": response.status_code, "headers": out})
+
+            async def pump():
+                async for chunk in response.aiter_raw():
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+            async def disconnected():
+                while (await receive())["type"] != "http.disconnect":
+                    pass
+
+            # SSE처럼 끝나지 않는 응답은 클라이언트가 끊으면 워커 쪽 스트림도 닫는다
+            tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await response.aclose()
+
+    async def _readyz(self, send):
+        """모든 워커가 ready일 때만 200"""
+        async def fetch(port):
+            try:
+                r = await self._client.get(f"http://127.0.0.1:{port}/readyz")
+                return r.json()
+            except Exception as e:
+                return {"ready": False, "error": str(e)}
+
+        workers = await asyncio.gather(*(fetch(p) for p in self.ports))
+        ready = all(w.get("ready") for w in workers)
+        body = json.dumps({"ready": ready, "workers": workers}, ensure_ascii=False).encode()
+        await send({"type": "http.response.start", "status": 200 if ready else 503,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _metrics(self, send):
+        async def fetch(i, port):
+            try:
+                return i, (await self._client.get(f"http://127.0.0.1:{port}/metrics")).text
+            except Exception:
+                return i, ""
+
+        texts = await asyncio.gather(*(fetch(i, p) for i, p in enumerate(self.ports)))
+        up = "\n".join(f'smus_worker_up{{worker="{i}"}} {1 if t else 0}' for i, t in texts)
+        body = "# HELP smus_worker_up Whether the worker answered the metrics scrape.\n# TYPE smus_worker_up gauge\n"
+        body += up + "\n" + _merge_metrics([(i, t) for i, t in texts if t])
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8")]})
+        await send({"type": "http.response.body", "body": body.encode()})
+
+
+def _run_workers(count: int, port: int, host: str) -> None:
+    """워커 N개를 띄우고(죽으면 같은 포트로 재시작) 앞단 프록시를 실행한다."""
+    import secrets
+    import socket
+    import subprocess
+    import sys
+    import uvicorn
+
+    argv = [sys.executable, os.path.abspath(__file__)]
+    token = secrets.token_hex(16)
+    workers: list[Optional[subprocess.Popen]] = [None] * count
+    stopping = threading.Event()
+
+    def spawn(i: int) -> None:
+        workers[i] = subprocess.Popen(argv, env=_worker_env(i, count, token))
+        logger.info("worker %d started (pid %d, port %d)", i, workers[i].pid, WORKER_BASE_PORT + i)
+
+    def supervise() -> None:
+        while not stopping.wait(1.0):
+            for i, proc in enumerate(workers):
+                if proc is not None and proc.poll() is not None and not stopping.is_set():
+                    logger.warning("worker %d exited with %s, restarting", i, proc.returncode)
+                    spawn(i)
+
+    for i in range(count):
+        spawn(i)
+    # 모든 워커가 포트를 열 때까지 기다린 뒤 앞단을 연다 (각 워커는 기동 중 풀/캐시를 데움)
+    deadline = time.monotonic() + WORKER_START_TIMEOUT
+    for i in range(count):
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", WORKER_BASE_PORT + i), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+        else:
+            logger.warning("worker %d did not start listening within %.0fs", i, WORKER_START_TIMEOUT)
+    threading.Thread(target=supervise, name="smus-supervisor", daemon=True).start()
+    try:
+        # uvicorn도 WEB_CONCURRENCY를 읽으므로 앞단은 workers=1로 고정
+        uvicorn.run(SessionAffineProxy([WORKER_BASE_PORT + i for i in range(count)]),
+                    host=host, port=port, workers=1, log_level="info")
+    finally:
+        stopping.set()
+        for proc in workers:
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+        for proc in workers:
+            if proc is not None:
+                try:
+                    proc.wait(10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+
 if __name__ == "__main__":
+    import sys
+
+    # 일회성 관리 명령: smu_meals 정규화 컬럼/인덱스 마이그레이션
+    if "--migrate-meals" in sys.argv:
+        logging.basicConfig(level=logging.INFO)
+        print(json.dumps(_migrate_meal_columns(), ensure_ascii=False, indent=2))
+        sys.exit(0)
+    # 일회성 관리 명령: smu_schedule 날짜 범위 조회용 복합 인덱스
+    if "--migrate-schedule" in sys.argv:
+        logging.basicConfig(level=logging.INFO)
+        print(json.dumps(_migrate_schedule_index(), ensure_ascii=False, indent=2))
+        sys.exit(0)
+
     # Smithery Python custom container 가이드에 따라 PORT 사용, streamable-http로 실행
     # 참고: https://smithery.ai/docs/migrations/python-custom-container
     from starlette.middleware.cors import CORSMiddleware
     import uvicorn
+
+    import os
+    port = int(os.environ.get("PORT", 8081))
+    host = os.environ.get("HOST", "0.0.0.0")
+    if WEB_CONCURRENCY > 1:
+        logging.basicConfig(level=logging.INFO)
+        _run_workers(WEB_CONCURRENCY, port, host)
+        sys.exit(0)
     
     app = mcp.streamable_http_app()
     app.add_middleware(
@@ -526,7 +4287,7 @@ if __name__ == "__main__":
         expose_headers=["mcp-session-id", "mcp-protocol-version"],
         max_age=86400,
     )
-    import os
-    port = int(os.environ.get("PORT", 8081))
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+    _start_background_jobs()
+
+    uvicorn.run(app, host=host, port=port, log_level="info")
 
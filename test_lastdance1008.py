@@ -0,0 +1,112 @@
+"""DB 없이 돌아가는 순수 함수 회귀 테스트 (python -m pytest -q)"""
+from datetime import datetime
+
+import pytest
+
+import lastdance1008 as m
+
+NOW = datetime(2025, 10, 17, 12, 0, tzinfo=m.KST)
+
+
+# ---- 날짜 표현 해석 / 기간 겹침 ----
+
+@pytest.mark.parametrize("expr", ["2025", "2025년"])
+def test_bare_year_in_window(expr):
+    start, end = m._parse_date_expression(expr, NOW)
+    assert (start.year, start.month, start.day) == (2025, 1, 1)
+    assert (end.year, end.month, end.day) == (2026, 1, 1)
+
+
+@pytest.mark.parametrize("expr", ["1021", "1231", str(NOW.year + m.BARE_YEAR_WINDOW + 1)])
+def test_bare_year_out_of_window_falls_back_to_like(expr):
+    with pytest.raises(ValueError):
+        m._parse_date_expression(expr, NOW)
+
+
+@pytest.mark.parametrize("expr", ["13-45", "02-30", "2025-13-01"])
+def test_invalid_month_day_falls_back_to_like(expr):
+    with pytest.raises(ValueError):
+        m._parse_date_expression(expr, NOW)
+
+
+def test_month_day_uses_current_year():
+    start, end = m._parse_date_expression("10-21", NOW)
+    assert start == datetime(2025, 10, 21, tzinfo=m.KST)
+    assert end == datetime(2025, 10, 22, tzinfo=m.KST)
+
+
+def _schedule(id, start, end=None):
+    return {"id": id, "type": "common", "user_id": None, "content": f"일정 {id}", "start_date": start, "end_date": end}
+
+
+def test_schedule_range_keeps_open_ended_rows():
+    common = [
+        _schedule(1, datetime(2025, 10, 1), None),                     # 기간 전에 시작, end_date 없음 → 하루짜리
+        _schedule(2, datetime(2025, 10, 1), datetime(2025, 10, 30)),   # 여러 날에 걸친 일정
+        _schedule(3, datetime(2025, 10, 21, 9), None),                  # 기간 안에 시작, end_date 없음
+        _schedule(4, datetime(2025, 10, 22), None),                     # 기간 이후
+    ]
+    tiers = (common, [], set(common[0]))
+    start, end = m._parse_date_expression("2025-10-21", NOW)
+    assert [r["id"] for r in m._schedule_range_cached(tiers, start, end)] == [2, 3]
+
+
+# ---- 키셋 페이지네이션 / 커서 ----
+
+def _paginate(db, order, page_size=3):
+    """_keyset_clause로 끝까지 넘겨 본 결과 (SQLite는 MySQL과 같이 NULL을 가장 작은 값으로 정렬)"""
+    order_by = " ORDER BY " + ", ".join(f"`{c}` {d}" for c, d in order)
+    rows, after = [], None
+    while True:
+        sql, args = "SELECT id, a FROM t WHERE 1 = 1", []
+        if after is not None:
+            clause, args = m._keyset_clause(order, after)
+            sql += " AND " + clause
+        page = db.execute((sql + order_by + " LIMIT ?").replace("%s", "?"), [*args, page_size]).fetchall()
+        if not page:
+            return rows
+        rows.extend(page)
+        last = dict(zip(("id", "a"), page[-1]))
+        after = [last[c] for c, _ in order]
+
+
+@pytest.mark.parametrize("order", [
+    [("a", "ASC"), ("id", "ASC")],
+    [("a", "DESC"), ("id", "ASC")],
+    [("a", "DESC"), ("id", "DESC")],
+])
+def test_keyset_pages_through_null_sort_keys(order):
+    import sqlite3
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE t (id INTEGER, a TEXT)")
+    db.executemany("INSERT INTO t VALUES (?, ?)", [(i, [None, "x", "y"][i % 3]) for i in range(1, 20)])
+    order_by = " ORDER BY " + ", ".join(f"`{c}` {d}" for c, d in order)
+    assert _paginate(db, order) == db.execute("SELECT id, a FROM t" + order_by).fetchall()
+
+
+def test_keyset_clause_null_key_uses_is_null():
+    clause, args = m._keyset_clause([("start_date", "ASC"), ("id", "ASC")], [None, 7])
+    assert "`start_date` IS NOT NULL" in clause
+    assert "`start_date` IS NULL" in clause
+    assert None not in args and args == [7]
+
+
+def test_cursor_round_trip():
+    cursor = m._encode_cursor("sql", ["2025-10-21 00:00:00", 3])
+    assert m._check_cursor(m._decode_cursor(cursor), "sql", 2) == ("sql", ["2025-10-21 00:00:00", 3])
+
+
+@pytest.mark.parametrize("cursor", [
+    m._encode_cursor("sql", [3]),          # 정렬 키 개수가 다름
+    m._encode_cursor("sql", [1, 2, 3]),
+    m._encode_cursor("idx", [0.5, 3]),     # 검색 색인에서 만든 커서
+])
+def test_query_page_rejects_mismatched_cursor(cursor):
+    with pytest.raises(ValueError, match="no longer valid"):
+        m._query_page("smu_notices", "1 = 1", [], [("created_at", "DESC"), ("id", "DESC")], 10, cursor, None)
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        m._decode_cursor("not-a-cursor")